@@ -0,0 +1,250 @@
+"""Conversation analytics: a buffered event sink and a query CLI.
+
+The chat path only appends a tuple to an in-memory buffer; a background thread
+flushes the buffer periodically to columnar files: Parquet when pyarrow is
+installed, NumPy .npz column arrays when only numpy is, CSV otherwise. The
+query CLI loads those files into NumPy arrays and computes the aggregates with
+vectorized operations. Analytics is off unless PIZZABAHN_ANALYTICS_DIR names the
+directory for the event files.
+
+Usage:
+    python analytics.py --dir analytics_data                 # all reports
+    python analytics.py --dir analytics_data --report basket
+"""
+import argparse
+import atexit
+import csv
+import datetime
+import glob
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Any
+
+try:
+    import numpy as np
+except ImportError:  # required by the query CLI only
+    np = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # CSV fallback
+    pa = None
+    pq = None
+
+COLUMNS = ["ts", "event", "session_id", "branch_id", "from_step", "to_step", "total", "item_count", "item_ids"]
+
+
+class AnalyticsSink:
+    """Buffers events in memory and writes them out in batches from a background thread."""
+
+    def __init__(self, directory: str, flush_interval: float = 30.0,
+                 max_buffer: int = 50000):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.buffer: deque = deque()
+        self.wakeup = threading.Event()
+        self.write_lock = threading.Lock()
+        self.batch = 0
+        os.makedirs(directory, exist_ok=True)
+        self._start_thread()
+        # Pre-forking servers copy the sink into each worker, but not its thread
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+        atexit.register(self.flush)
+
+    def _start_thread(self):
+        self.thread = threading.Thread(target=self._run, name="analytics-flush", daemon=True)
+        self.thread.start()
+
+    def _after_fork(self):
+        self.buffer.clear()  # the parent flushes its own events
+        self.write_lock = threading.Lock()
+        self._start_thread()
+
+    @classmethod
+    def from_env(cls) -> Optional["AnalyticsSink"]:
+        """Sink writing to PIZZABAHN_ANALYTICS_DIR; None (no thread, no files) when it is unset or empty."""
+        directory = os.environ.get("PIZZABAHN_ANALYTICS_DIR")
+        return cls(directory) if directory else None
+
+    def record(self, event: str, session_id: str, branch_id: Optional[str] = None, from_step: str = "",
+               to_step: str = "", total: float = 0.0, item_ids: Optional[List[str]] = None):
+        """Queue one event. Called on the request path, so it only appends to the buffer."""
+        item_ids = item_ids or []
+        self.buffer.append((time.time(), event, session_id, branch_id or "", from_step, to_step,
+                            total, len(item_ids), "|".join(item_ids)))
+        if len(self.buffer) >= self.max_buffer:
+            self.wakeup.set()
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Analytics flush error: {e}")
+
+    def flush(self):
+        """Write everything buffered so far to a new columnar file."""
+        with self.write_lock:
+            rows = []
+            while self.buffer:
+                rows.append(self.buffer.popleft())
+            if not rows:
+                return
+            columns = dict(zip(COLUMNS, map(list, zip(*rows))))
+            self.batch += 1
+            stem = os.path.join(self.directory, f"events-{int(time.time())}-{os.getpid()}-{self.batch}")
+            if pq is not None:
+                pq.write_table(pa.table(columns), stem + ".parquet")
+            elif np is not None:
+                np.savez(stem + ".npz", **{name: np.asarray(values) for name, values in columns.items()})
+            else:
+                with open(stem + ".csv", "w", newline="", encoding="utf-8") as f:
+                    writer = csv.writer(f)
+                    writer.writerow(COLUMNS)
+                    writer.writerows(rows)
+            print(f"Analytics: flushed {len(rows)} events to {stem}")
+
+
+# ---- query side --------------------------------------------------------------
+
+def load_events(directory: str) -> Dict[str, Any]:
+    """Load every events file in `directory` into one NumPy array per column."""
+    if np is None:
+        raise RuntimeError("numpy is required for analytics queries: pip install numpy")
+    parts: Dict[str, List[Any]] = {name: [] for name in COLUMNS}
+    for path in sorted(glob.glob(os.path.join(directory, "events-*.parquet"))):
+        if pq is None:
+            raise RuntimeError("pyarrow is required to read Parquet event files")
+        table = pq.read_table(path, columns=COLUMNS)
+        for name in COLUMNS:
+            parts[name].append(table.column(name).to_numpy(zero_copy_only=False))
+    for path in sorted(glob.glob(os.path.join(directory, "events-*.npz"))):
+        with np.load(path) as data:
+            for name in COLUMNS:
+                parts[name].append(data[name])
+    for path in sorted(glob.glob(os.path.join(directory, "events-*.csv"))):
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader)
+            columns = list(zip(*reader))
+        if columns:
+            for name, values in zip(COLUMNS, columns):
+                parts[name].append(np.asarray(values))
+
+    events = {}
+    for name in COLUMNS:
+        values = np.concatenate(parts[name]) if parts[name] else np.array([])
+        if name in ("ts", "total"):
+            events[name] = values.astype(np.float64)
+        elif name == "item_count":
+            events[name] = values.astype(np.int64)
+        else:
+            events[name] = values.astype(str)
+    return events
+
+
+def orders_per_hour(events: Dict[str, Any]) -> List[str]:
+    orders = events["event"] == "order_confirmed"
+    hours = (events["ts"][orders] // 3600).astype(np.int64)
+    if not hours.size:
+        return ["No confirmed orders."]
+    span = hours.max() - hours.min() + 1
+    by_hour_of_day = np.bincount(hours % 24, minlength=24)
+    lines = [f"{orders.sum()} orders over {span} hours ({orders.sum() / span:.2f} per hour)",
+             "Orders by hour of day (UTC):"]
+    peak = by_hour_of_day.max()
+    for hour, count in enumerate(by_hour_of_day):
+        bar = "#" * int(40 * count / peak) if peak else ""
+        lines.append(f"  {hour:02d}:00 {count:>8} {bar}")
+    return lines
+
+
+def average_basket(events: Dict[str, Any]) -> List[str]:
+    orders = events["event"] == "order_confirmed"
+    if not orders.any():
+        return ["No confirmed orders."]
+    totals = events["total"][orders]
+    counts = events["item_count"][orders]
+    lines = [f"Average basket: €{totals.mean():.2f} (median €{np.median(totals):.2f}), "
+             f"{counts.mean():.2f} items per order"]
+    for branch in np.unique(events["branch_id"][orders]):
+        mask = events["branch_id"][orders] == branch
+        lines.append(f"  {branch or '(none)':<16} {mask.sum():>8} orders  avg €{totals[mask].mean():.2f}")
+    return lines
+
+
+def step_abandonment(events: Dict[str, Any]) -> List[str]:
+    """Where sessions that never confirmed an order stopped."""
+    transitions = events["event"] == "step_transition"
+    sessions = events["session_id"][transitions]
+    if not sessions.size:
+        return ["No step transitions."]
+    ts = events["ts"][transitions]
+    steps = events["to_step"][transitions]
+    order = np.lexsort((ts, sessions))
+    sessions, steps = sessions[order], steps[order]
+    is_last = np.append(sessions[1:] != sessions[:-1], True)
+    last_sessions, last_steps = sessions[is_last], steps[is_last]
+
+    ordered = np.unique(events["session_id"][events["event"] == "order_confirmed"])
+    abandoned = ~np.isin(last_sessions, ordered)
+    names, counts = np.unique(last_steps[abandoned], return_counts=True)
+    lines = [f"{abandoned.sum()} of {last_sessions.size} sessions ended without an order"]
+    for i in np.argsort(-counts):
+        lines.append(f"  {names[i]:<24} {counts[i]:>8} ({counts[i] / last_sessions.size:.1%})")
+    return lines
+
+
+def popular_items(events: Dict[str, Any], top: int = 10) -> List[str]:
+    orders = events["event"] == "order_confirmed"
+    joined = "|".join(events["item_ids"][orders][events["item_count"][orders] > 0])
+    if not joined:
+        return ["No ordered items."]
+    names, counts = np.unique(np.array(joined.split("|")), return_counts=True)
+    pizzas = np.char.startswith(names, "P")
+    lines = ["Most ordered pizzas:"]
+    for i in np.argsort(-counts[pizzas])[:top]:
+        lines.append(f"  {names[pizzas][i]:<6} {counts[pizzas][i]:>8}")
+    return lines
+
+
+REPORTS = {
+    "orders-per-hour": orders_per_hour,
+    "basket": average_basket,
+    "abandonment": step_abandonment,
+    "popular": popular_items,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default=os.environ.get("PIZZABAHN_ANALYTICS_DIR") or "analytics_data",
+                        help="directory with events-* files (default: $PIZZABAHN_ANALYTICS_DIR)")
+    parser.add_argument("--report", choices=["all"] + list(REPORTS), default="all")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    events = load_events(args.dir)
+    loaded = time.perf_counter()
+    if events["ts"].size:
+        first = datetime.datetime.utcfromtimestamp(events["ts"].min())
+        last = datetime.datetime.utcfromtimestamp(events["ts"].max())
+        print(f"{events['ts'].size} events from {first:%Y-%m-%d %H:%M} to {last:%Y-%m-%d %H:%M} UTC "
+              f"(loaded in {loaded - started:.2f}s)\n")
+    for name, report in REPORTS.items():
+        if args.report in ("all", name):
+            print(f"== {name} ==")
+            print("\n".join(report(events)))
+            print()
+    print(f"Reports computed in {time.perf_counter() - loaded:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Request-path overhead of the profiling hooks.
+
+Runs the same /api/chat requests (fake model, analytics off) through Flask's test
+client in a fresh process per configuration, keeping the best of --repeat runs:
+  * off:      PIZZABAHN_PROFILE unset, no hooks registered
+  * idle:     profiling enabled, but no request sampled
+  * cpu:      every request captured with cProfile and stack sampling
+  * all:      every request captured with cProfile, stack sampling and tracemalloc
+
+Usage:
+    python benchmarks/profiling_overhead.py --requests 2000
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+
+MAIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, MAIN_DIR)
+
+PROFILE_ENV = {"PIZZABAHN_PROFILE": "1", "PIZZABAHN_PROFILE_TOKEN": "bench"}
+CONFIGS = {
+    "off": ({}, {}),
+    "idle": (PROFILE_ENV, {}),
+    "cpu": (PROFILE_ENV, {"X-Profile": "cpu", "X-Profile-Token": "bench"}),
+    "all": (PROFILE_ENV, {"X-Profile": "all", "X-Profile-Token": "bench"}),
+}
+MESSAGES = ["hi", "I want pizza", "vegetarian please", "P1 and P3", "no toppings", "no thanks"]
+
+
+def measure(config: str, requests: int, repeat: int) -> float:
+    """Best mean seconds per /api/chat request; runs inside the child process."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        import main
+        from simulator import FakeModel
+        for tenant in main.tenants.tenants.values():
+            tenant.chatbot.model = FakeModel()
+            tenant.config.hours = {}
+            tenant.config.max_sessions = tenant.quota.requests_per_minute = 10 ** 9
+        client = main.app.test_client()
+        headers = CONFIGS[config][1]
+
+        def run(count: int):
+            for i in range(count):
+                client.post("/api/chat", headers=headers, json={
+                    "message": MESSAGES[i % len(MESSAGES)], "session_id": f"bench-{i // len(MESSAGES)}"})
+
+        run(min(requests, 200))  # warm up
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run(requests)
+            timings.append((time.perf_counter() - start) / requests)
+        return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--config", choices=list(CONFIGS), help=argparse.SUPPRESS)  # child process
+    args = parser.parse_args()
+
+    if args.config:
+        print(json.dumps(measure(args.config, args.requests, args.repeat)))
+        return
+
+    results = {}
+    for config, (env, _) in CONFIGS.items():
+        child_env = {k: v for k, v in os.environ.items() if not k.startswith("PIZZABAHN_PROFILE")}
+        child_env.update(env, PIZZABAHN_ANALYTICS_DIR="", PIZZABAHN_PROFILE_HEAP_INTERVAL="0")
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--config", config,
+                                 "--requests", str(args.requests), "--repeat", str(args.repeat)],
+                                env=child_env, capture_output=True, text=True, check=True).stdout
+        results[config] = json.loads(output.strip().splitlines()[-1])
+        print(f"{config:<6} {results[config] * 1e6:9.1f} us/request   "
+              f"{(results[config] / results['off'] - 1) * 100:+7.1f}% vs off")
+
+
+if __name__ == "__main__":
+    main()
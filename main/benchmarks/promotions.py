@@ -0,0 +1,152 @@
+"""Promotions engine benchmark.
+
+Compiles a synthetic catalogue with 500 active promotions and prices 50-line carts:
+  * cold:        fresh session, full update + evaluate
+  * incremental: one cart line changes, then update + evaluate (what a chat turn does)
+  * unchanged:   evaluate again with nothing changed (cached)
+
+500 promotions are past MAX_EXACT_PROMOTIONS, so those carts are priced greedily. The
+exact case prices a few lines of many units against MAX_EXACT_PROMOTIONS overlapping
+promotions, which goes through the exact search (or hits its budget and falls back).
+
+Usage:
+    python benchmarks/promotions.py --promotions 500 --lines 50 --exact-units 199
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import promotions  # noqa: E402
+from promotions import PromotionEngine  # noqa: E402
+
+
+def build_catalogue(rng: random.Random, per_category: int = 100):
+    menu = {
+        category: [{"id": f"{prefix}{i}", "price": round(rng.uniform(low, high), 2)} for i in range(per_category)]
+        for category, prefix, low, high in (("pizzas", "P", 8, 14), ("extras", "E", 3, 7), ("drinks", "D", 1.5, 4.5))
+    }
+    prices = {item['id']: item['price'] for items in menu.values() for item in items}
+    return menu, prices
+
+
+def build_spec(rng: random.Random, menu, count: int):
+    all_ids = [item['id'] for items in menu.values() for item in items]
+    promotions = []
+    for i in range(count):
+        kind = rng.random()
+        if kind < 0.4:
+            slots = [{"category": rng.choice(["pizzas", "extras"]), "count": rng.randint(1, 2)},
+                     {"items": rng.sample(all_ids, rng.randint(5, 20)), "count": 1}]
+            promotions.append({"id": f"C{i}", "name": f"Combo {i}", "slots": slots,
+                               "amount_off": round(rng.uniform(1, 5), 2)})
+        elif kind < 0.7:
+            promotions.append({"id": f"S{i}", "name": f"Item deal {i}",
+                               "slots": [{"items": rng.sample(all_ids, 3), "count": 1}],
+                               "percent_off": rng.choice([10, 15, 20, 25])})
+        elif kind < 0.9:
+            promotions.append({"id": f"H{i}", "name": f"Happy hour {i}",
+                               "slots": [{"category": rng.choice(["pizzas", "drinks"]), "count": 1}],
+                               "percent_off": rng.choice([5, 10, 15]), "start": "00:00", "end": "23:59"})
+        else:
+            promotions.append({"id": f"F{i}", "name": f"Pair {i}",
+                               "slots": [{"items": rng.sample(all_ids, 10), "count": 2}],
+                               "fixed_price": round(rng.uniform(5, 15), 2)})
+    coupons = [{"code": "SAVE10", "name": "10% off", "percent_off": 10, "min_subtotal": 20}]
+    return {"promotions": promotions, "coupons": coupons}
+
+
+def build_exact_spec(rng: random.Random, menu, count: int):
+    """Overlapping deals over a handful of items, so every one of them is active for the same cart."""
+    ids = [item['id'] for items in menu.values() for item in items[:4]]
+    promotions = []
+    for i in range(count):
+        slots = [{"items": rng.sample(ids, 4), "count": rng.randint(1, 2)}]
+        if i % 2:
+            slots.append({"items": rng.sample(ids, 4), "count": 1})
+        promotions.append({"id": f"X{i}", "name": f"Deal {i}", "slots": slots,
+                           "amount_off": round(rng.uniform(1, 5), 2)})
+    return {"promotions": promotions, "coupons": []}, ids
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--promotions", type=int, default=500)
+    parser.add_argument("--lines", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--exact-units", type=int, default=promotions.MAX_EXACT_UNITS - 1,
+                        help="cart size (units) for the exact search case")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    menu, prices = build_catalogue(rng)
+    start = time.perf_counter()
+    engine = PromotionEngine.compile(build_spec(rng, menu, args.promotions), menu)
+    compile_ms = (time.perf_counter() - start) * 1e3
+    now = datetime.datetime(2026, 1, 5, 12, 0)
+
+    carts = [Counter({item_id: rng.randint(1, 3) for item_id in rng.sample(list(prices), args.lines)})
+             for _ in range(args.repeat)]
+
+    def cold():
+        session = engine.session()
+        session.update(carts[rng.randrange(len(carts))], prices)
+        return session.evaluate("SAVE10", now=now)
+
+    session = engine.session()
+    cart = Counter(carts[0])
+    session.update(cart, prices)
+    session.evaluate("SAVE10", now=now)
+    line_ids = list(cart)
+
+    def incremental():
+        item_id = rng.choice(line_ids)
+        cart[item_id] = cart[item_id] % 3 + 1
+        session.update(cart, prices)
+        return session.evaluate("SAVE10", now=now)
+
+    def unchanged():
+        session.update(cart, prices)
+        return session.evaluate("SAVE10", now=now)
+
+    breakdown = cold()
+    print(f"{args.promotions} promotions compiled in {compile_ms:.1f} ms; "
+          f"{sum(len(v) for v in engine.by_item.values())} index entries over {len(engine.by_item)} items")
+    print(f"Sample {args.lines}-line cart: subtotal €{breakdown.subtotal:.2f}, "
+          f"{len(breakdown.discounts)} discounts, total €{breakdown.total:.2f}")
+    print(f"{'cold (new session)':<28}{timed(cold, args.repeat) * 1e3:>9.3f} ms")
+    print(f"{'incremental (1 line change)':<28}{timed(incremental, args.repeat) * 1e3:>9.3f} ms")
+    print(f"{'unchanged (cached)':<28}{timed(unchanged, args.repeat) * 1e3:>9.3f} ms")
+
+    exact_spec, exact_ids = build_exact_spec(rng, menu, promotions.MAX_EXACT_PROMOTIONS)
+    exact_engine = PromotionEngine.compile(exact_spec, menu)
+    exact_cart = Counter(rng.choice(exact_ids) for _ in range(args.exact_units))
+
+    def exact():
+        session = exact_engine.session()
+        session.update(exact_cart, prices)
+        return session.evaluate(now=now)
+
+    session = exact_engine.session()
+    session.update(exact_cart, prices)
+    completed = session._search(sorted(session.bounds)) is not None
+    label = f"exact ({args.exact_units} units)"
+    print(f"{label:<28}{timed(exact, max(args.repeat // 20, 5)) * 1e3:>9.3f} ms"
+          f"  ({'exact search' if completed else 'budget hit, greedy fallback'})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Memory benchmark for multi-branch tenancy.
+
+Builds a registry of N tenants backed by K distinct menus and reports:
+  * bytes retained by the registry (tracemalloc), for several K at fixed N
+  * private (dirtied) memory per forked worker after every worker has served every
+    tenant, with 1 and with N distinct menus, against a registry without sharing
+    (every tenant builds its own copy of the menu, nothing frozen). With sharing it
+    follows the distinct menus; without, it follows tenants x workers.
+
+Usage:
+    python benchmarks/tenant_memory.py --tenants 100 --workers 4
+"""
+import argparse
+import contextlib
+import copy
+import gc
+import multiprocessing
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import MenuManager, PizzaChatbot, delivery_zones, promotions  # noqa: E402
+from tenants import BranchConfig, TenantRegistry  # noqa: E402
+
+
+def build_registry(num_tenants: int, distinct_menus: int, shared: bool = True) -> TenantRegistry:
+    """`shared=False` gives every tenant a private deep copy of its menu."""
+    configs = [
+        BranchConfig(
+            branch_id=f"branch-{i}",
+            name=f"PizzaBahn #{i}",
+            price_overrides={"P1": 8.50 + (i % distinct_menus) * 0.10},
+        )
+        for i in range(num_tenants)
+    ]
+    with contextlib.redirect_stdout(None):  # one "chatbot initialized" line per tenant
+        return TenantRegistry(
+            configs,
+            base_menu=MenuManager().menu_data,
+            menu_factory=MenuManager if shared else (lambda menu: MenuManager(copy.deepcopy(menu))),
+            chatbot_factory=lambda menu_manager, model: PizzaChatbot(menu_manager, model, delivery_zones,
+                                                                     promotions=promotions),
+        )
+
+
+def measure_build(num_tenants: int, distinct_menus: int) -> int:
+    tracemalloc.start()
+    registry = build_registry(num_tenants, distinct_menus)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert registry.distinct_menus == distinct_menus
+    return retained
+
+
+def private_dirty_kb() -> int:
+    """Private_Dirty of this process in kB (Linux only)."""
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Private_Dirty:"):
+                return int(line.split()[1])
+    return 0
+
+
+def serve_all_tenants(registry: TenantRegistry, queue):
+    before = private_dirty_kb()
+    for tenant in registry.tenants.values():
+        tenant.menu_manager.get_menu_as_string()
+        tenant.menu_manager.get_menu_as_string("vegan")
+        tenant.menu_manager.get_pizza_by_id("P1")
+    queue.put(private_dirty_kb() - before)
+
+
+def measure_workers(registry: TenantRegistry, workers: int, freeze: bool = True) -> list:
+    if freeze:
+        registry.freeze()
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+    procs = [ctx.Process(target=serve_all_tenants, args=(registry, queue)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    results = [queue.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tenants", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"Registry size for {args.tenants} tenants")
+    print(f"{'distinct menus':>15} {'retained KiB':>13} {'KiB/menu':>9} {'KiB/tenant':>11}")
+    for distinct in sorted({1, 5, 25, args.tenants}):
+        if distinct > args.tenants:
+            continue
+        retained = measure_build(args.tenants, distinct) / 1024
+        print(f"{distinct:>15} {retained:>13.1f} {retained / distinct:>9.1f} {retained / args.tenants:>11.1f}")
+
+    if sys.platform.startswith("linux"):
+        print(f"\nPrivate memory dirtied per forked worker serving all {args.tenants} tenants ({args.workers} workers)")
+        print(f"{'registry':>32} {'KiB/worker':>11} {'KiB total':>10}")
+        for label, distinct, shared in (("shared, 1 menu", 1, True),
+                                        (f"shared, {args.tenants} menus", args.tenants, True),
+                                        (f"unshared, {args.tenants} copies", args.tenants, False)):
+            registry = build_registry(args.tenants, distinct, shared)
+            dirtied = measure_workers(registry, args.workers, freeze=shared)
+            print(f"{label:>32} {sum(dirtied) / len(dirtied):>11.0f} {sum(dirtied):>10}")
+            if hasattr(gc, "unfreeze"):
+                gc.unfreeze()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""WebSocket transport benchmark with a local client swarm.
+
+Starts ws_server.py in a subprocess (fake model, quotas and opening hours lifted,
+analytics off) and then:
+  * opens --connections connections that say hello and stay idle, reporting handshake
+    latency and the server's resident memory per connection
+  * while those stay open, --active of them chat for --turns messages each, reporting the
+    time to the first streamed chunk and to the final reply
+  * sends the same number of messages over a fresh connection each, which is the
+    connection setup a POST to /api/chat pays without keep-alive
+
+Usage:
+    python benchmarks/ws_swarm.py --connections 5000 --active 50 --turns 5 --model-latency 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from websockets.asyncio.client import connect  # noqa: E402
+
+from simulator import LatencyHistogram  # noqa: E402
+from ws_server import raise_fd_limit  # noqa: E402
+
+MESSAGES = ["hi", "I want pizza", "vegetarian please", "P1 and P3", "no toppings", "no thanks"]
+
+
+def rss_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def start_server(port: int, model_latency: float, workers: int) -> subprocess.Popen:
+    main_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PIZZABAHN_ANALYTICS_DIR="")
+    return subprocess.Popen(
+        [sys.executable, "ws_server.py", "--port", str(port), "--fake-model", "--unlimited",
+         "--model-latency", str(model_latency), "--workers", str(workers)],
+        cwd=main_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+async def wait_for_server(url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            async with connect(url):
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+async def open_session(url: str, session_id: str):
+    websocket = await connect(url, compression=None, ping_interval=None, open_timeout=60)
+    await websocket.send(json.dumps({"type": "hello", "session_id": session_id}))
+    ready = json.loads(await websocket.recv())
+    assert ready["type"] == "ready", ready
+    return websocket
+
+
+async def chat(websocket, text: str):
+    """Send one message; returns (seconds to first chunk or None, seconds to reply)."""
+    start = time.perf_counter()
+    first_chunk = None
+    await websocket.send(json.dumps({"type": "message", "text": text}))
+    while True:
+        frame = json.loads(await websocket.recv())
+        if frame["type"] == "chunk" and first_chunk is None:
+            first_chunk = time.perf_counter() - start
+        elif frame["type"] in ("reply", "error"):
+            return first_chunk, time.perf_counter() - start
+
+
+def report(name: str, histogram: LatencyHistogram):
+    print(f"  {name:<28} n={histogram.count:<7} mean {histogram.mean * 1e3:8.2f} ms   "
+          f"p50 {histogram.percentile(50) * 1e3:8.2f} ms   p99 {histogram.percentile(99) * 1e3:8.2f} ms")
+
+
+async def run(args, server_pid: int):
+    url = f"ws://127.0.0.1:{args.port}/"
+    await wait_for_server(url)
+    await asyncio.sleep(0.5)
+    baseline_kb = rss_kb(server_pid)
+
+    handshake = LatencyHistogram()
+    gate = asyncio.Semaphore(args.concurrency)
+
+    async def open_one(i: int):
+        async with gate:
+            start = time.perf_counter()
+            websocket = await open_session(url, f"swarm-{i}")
+            handshake.add(time.perf_counter() - start)
+            return websocket
+
+    start = time.perf_counter()
+    sockets = await asyncio.gather(*(open_one(i) for i in range(args.connections)))
+    opened = time.perf_counter() - start
+    await asyncio.sleep(1.0)
+    idle_kb = rss_kb(server_pid)
+    print(f"Opened {len(sockets)} idle connections in {opened:.1f}s")
+    print(f"  server RSS {baseline_kb / 1024:.1f} MiB -> {idle_kb / 1024:.1f} MiB, "
+          f"{(idle_kb - baseline_kb) / len(sockets):.1f} KiB per idle connection")
+    report("connect + hello", handshake)
+
+    first_chunk, reply = LatencyHistogram(), LatencyHistogram()
+    rng = random.Random(args.seed)
+    active = rng.sample(sockets, min(args.active, len(sockets)))
+
+    async def converse(websocket):
+        for turn in range(args.turns):
+            chunk_time, reply_time = await chat(websocket, MESSAGES[turn % len(MESSAGES)])
+            if chunk_time is not None:
+                first_chunk.add(chunk_time)
+            reply.add(reply_time)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(converse(websocket) for websocket in active))
+    elapsed = time.perf_counter() - start
+    print(f"\n{len(active)} active sessions x {args.turns} turns over the open connections "
+          f"({len(sockets) - len(active)} idle alongside): {reply.count / elapsed:.0f} messages/s")
+    report("first streamed chunk", first_chunk)
+    report("final reply", reply)
+
+    fresh = LatencyHistogram()
+    fresh_gate = asyncio.Semaphore(len(active))  # same concurrency as the active sessions
+
+    async def fresh_connection(i: int):
+        async with fresh_gate:
+            start = time.perf_counter()
+            websocket = await open_session(url, f"fresh-{i}")
+            await chat(websocket, "hi")
+            fresh.add(time.perf_counter() - start)
+            await websocket.close()
+
+    await asyncio.gather(*(fresh_connection(i) for i in range(reply.count)))
+    print("\nSame number of messages, one new connection each:")
+    report("connect + hello + reply", fresh)
+
+    await asyncio.gather(*(websocket.close() for websocket in sockets))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=5000)
+    parser.add_argument("--active", type=int, default=50, help="connections that chat while the rest idle")
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--model-latency", type=float, default=200.0, help="fake model delay per call, in ms")
+    parser.add_argument("--workers", type=int, default=64, help="server threads running chat turns")
+    parser.add_argument("--concurrency", type=int, default=200, help="handshakes in flight at once")
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    limit = raise_fd_limit()
+    if limit is not None and args.connections + 100 > limit:
+        parser.error(f"--connections needs more file descriptors than the limit of {limit}")
+
+    server = start_server(args.port, args.model_latency, args.workers)
+    try:
+        asyncio.run(run(args, server.pid))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
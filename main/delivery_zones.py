@@ -0,0 +1,348 @@
+import json
+import os
+import re
+import bisect
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Any
+
+DEFAULT_DATASET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "delivery_zones.json")
+
+Point = Tuple[float, float]  # (lat, lon)
+
+_UMLAUTS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+_STREET_SUFFIX = re.compile(r"(strasse|str\.?)(?=\s|$)")
+_POSTCODE = re.compile(r"\b(\d{5})\b")
+_HOUSE_NUMBER = re.compile(r"^\d{1,4}[a-z]?$")
+# Lower-case words that may appear inside a street name ("Unter den Linden", "Am Kupfergraben")
+_STREET_PARTICLES = {"am", "an", "auf", "den", "der", "dem", "des", "im", "in", "zum", "zur", "von"}
+
+
+def normalize_street(name: str) -> str:
+    """Normalize a street name so 'Torstraße', 'torstrasse' and 'Torstr.' compare equal (and 'Karl-Marx' with 'Karl Marx')."""
+    name = name.lower().translate(_UMLAUTS)
+    name = re.sub(r"[^a-z0-9. ]", " ", name)
+    name = _STREET_SUFFIX.sub("str", name)
+    return re.sub(r"\s+", " ", name).strip()
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _point_in_polygon(lat: float, lon: float, polygon: List[Point]) -> bool:
+    """Ray casting test; the polygon is a list of (lat, lon) vertices."""
+    inside = False
+    j = len(polygon) - 1
+    for i in range(len(polygon)):
+        lat_i, lon_i = polygon[i]
+        lat_j, lon_j = polygon[j]
+        if (lon_i > lon) != (lon_j > lon):
+            cross_lat = lat_i + (lon - lon_i) * (lat_j - lat_i) / (lon_j - lon_i)
+            if lat < cross_lat:
+                inside = not inside
+        j = i
+    return inside
+
+
+def _segment_hits_rect(p1: Point, p2: Point, lat0: float, lon0: float, lat1: float, lon1: float) -> bool:
+    """Liang-Barsky clip: does the segment p1-p2 touch the rectangle?"""
+    t0, t1 = 0.0, 1.0
+    d_lat = p2[0] - p1[0]
+    d_lon = p2[1] - p1[1]
+    for p, q in ((-d_lat, p1[0] - lat0), (d_lat, lat1 - p1[0]),
+                 (-d_lon, p1[1] - lon0), (d_lon, lon1 - p1[1])):
+        if p == 0:
+            if q < 0:
+                return False
+            continue
+        r = q / p
+        if p < 0:
+            if r > t1:
+                return False
+            t0 = max(t0, r)
+        else:
+            if r < t0:
+                return False
+            t1 = min(t1, r)
+    return True
+
+
+@dataclass
+class DeliveryZone:
+    branch_id: str
+    name: str
+    polygon: List[Point]
+
+    def __post_init__(self):
+        lats = [p[0] for p in self.polygon]
+        lons = [p[1] for p in self.polygon]
+        self.bbox = (min(lats), min(lons), max(lats), max(lons))
+
+    def contains(self, lat: float, lon: float) -> bool:
+        """Check whether a point lies inside this zone."""
+        min_lat, min_lon, max_lat, max_lon = self.bbox
+        if not (min_lat <= lat <= max_lat and min_lon <= lon <= max_lon):
+            return False
+        return _point_in_polygon(lat, lon, self.polygon)
+
+
+@dataclass
+class AddressMatch:
+    """A parsed address and where it is.
+
+    `street` is the dataset's name when the street is known (`verified`), otherwise the
+    customer's own wording. `conflict` explains a postcode the street doesn't run through;
+    `located` is False when the street spans several zones and nothing picks the section.
+    """
+    street: Optional[str]
+    house_number: Optional[str]
+    postcode: Optional[str]
+    lat: float
+    lon: float
+    branch_id: Optional[str]
+    score: float
+    verified: bool = True
+    conflict: Optional[str] = None
+    located: bool = True
+
+    @property
+    def in_zone(self) -> bool:
+        return self.branch_id is not None
+
+    @property
+    def missing(self) -> List[str]:
+        """Parts the customer still has to give before the address can be used."""
+        return [part for part, value in (("street", self.street), ("house number", self.house_number)) if not value]
+
+    def format(self) -> str:
+        """Canonical one-line address, e.g. 'Torstraße 12, 10119 Berlin'."""
+        street = " ".join(part for part in (self.street, self.house_number) if part)
+        if self.postcode:
+            return f"{street}, {self.postcode} Berlin" if street else f"{self.postcode} Berlin"
+        return street
+
+
+class ZoneGridIndex:
+    """Uniform grid over the zone polygons.
+
+    Every cell is precomputed as either fully covered by one zone (answered with a
+    single list lookup) or as a boundary cell holding the few zones whose edges
+    cross it, which are then resolved with a point-in-polygon test.
+    """
+
+    def __init__(self, zones: List[DeliveryZone], cell_size: float = 0.0025):
+        self.zones = zones
+        self.cell_size = cell_size
+        self.min_lat = min(z.bbox[0] for z in zones)
+        self.min_lon = min(z.bbox[1] for z in zones)
+        max_lat = max(z.bbox[2] for z in zones)
+        max_lon = max(z.bbox[3] for z in zones)
+        self.rows = int((max_lat - self.min_lat) / cell_size) + 1
+        self.cols = int((max_lon - self.min_lon) / cell_size) + 1
+        self.cells: List[Any] = [None] * (self.rows * self.cols)
+        self._build()
+
+    def _build(self):
+        size = self.cell_size
+        for row in range(self.rows):
+            lat0 = self.min_lat + row * size
+            lat1 = lat0 + size
+            for col in range(self.cols):
+                lon0 = self.min_lon + col * size
+                lon1 = lon0 + size
+                boundary = []
+                covered_by = None
+                for zone in self.zones:
+                    z_lat0, z_lon0, z_lat1, z_lon1 = zone.bbox
+                    if z_lat1 < lat0 or z_lat0 > lat1 or z_lon1 < lon0 or z_lon0 > lon1:
+                        continue
+                    poly = zone.polygon
+                    crosses = any(
+                        _segment_hits_rect(poly[i - 1], poly[i], lat0, lon0, lat1, lon1)
+                        for i in range(len(poly))
+                    )
+                    if crosses:
+                        boundary.append(zone)
+                    elif covered_by is None and zone.contains((lat0 + lat1) / 2, (lon0 + lon1) / 2):
+                        covered_by = zone
+                if covered_by is not None and not boundary:
+                    self.cells[row * self.cols + col] = covered_by
+                elif covered_by is not None or boundary:
+                    self.cells[row * self.cols + col] = tuple(
+                        ([covered_by] if covered_by is not None else []) + boundary
+                    )
+
+    def locate(self, lat: float, lon: float) -> Optional[DeliveryZone]:
+        """Return the zone containing the point, or None if we don't deliver there."""
+        row = int((lat - self.min_lat) / self.cell_size)
+        col = int((lon - self.min_lon) / self.cell_size)
+        if row < 0 or col < 0 or row >= self.rows or col >= self.cols:
+            return None
+        cell = self.cells[row * self.cols + col]
+        if cell is None or isinstance(cell, DeliveryZone):
+            return cell
+        for zone in cell:
+            if zone.contains(lat, lon):
+                return zone
+        return None
+
+
+class StreetIndex:
+    """Fuzzy street-name index: trigram postings for matching, sorted keys for prefix autocomplete."""
+
+    def __init__(self, streets: List[Dict[str, Any]]):
+        self.streets = streets
+        self.normalized = [normalize_street(s['name']) for s in streets]
+        self.grams = [_trigrams(n) for n in self.normalized]
+        self.postings: Dict[str, List[int]] = {}
+        for idx, grams in enumerate(self.grams):
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(idx)
+        self.sorted_keys = sorted((n, idx) for idx, n in enumerate(self.normalized))
+
+    def match(self, text: str, min_score: float = 0.55) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Best street for `text` by trigram similarity, or None below `min_score`."""
+        query = normalize_street(text)
+        if not query:
+            return None
+        query_grams = _trigrams(query)
+        hits: Dict[int, int] = {}
+        for gram in query_grams:
+            for idx in self.postings.get(gram, ()):
+                hits[idx] = hits.get(idx, 0) + 1
+        best_idx, best_score = None, 0.0
+        for idx, common in hits.items():
+            score = common / (len(query_grams) + len(self.grams[idx]) - common)
+            if score > best_score:
+                best_idx, best_score = idx, score
+        if best_idx is None or best_score < min_score:
+            return None
+        return self.streets[best_idx], best_score
+
+    def autocomplete(self, prefix: str, limit: int = 5) -> List[str]:
+        """Street names starting with `prefix`, topped up with fuzzy matches."""
+        query = normalize_street(prefix)
+        if not query:
+            return []
+        results = []
+        pos = bisect.bisect_left(self.sorted_keys, (query, -1))
+        while pos < len(self.sorted_keys) and len(results) < limit:
+            key, idx = self.sorted_keys[pos]
+            if not key.startswith(query):
+                break
+            results.append(self.streets[idx]['name'])
+            pos += 1
+        if len(results) < limit:
+            match = self.match(prefix, min_score=0.3)
+            if match and match[0]['name'] not in results:
+                results.append(match[0]['name'])
+        return results
+
+
+class DeliveryZoneIndex:
+    """Offline delivery-zone engine: street validation, geocoding and branch lookup."""
+
+    def __init__(self, zones: List[DeliveryZone], streets: List[Dict[str, Any]], postcodes: Dict[str, Point]):
+        self.zones = {zone.branch_id: zone for zone in zones}
+        self.grid = ZoneGridIndex(zones)
+        self.streets = StreetIndex(streets)
+        self.postcodes = postcodes
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_DATASET_PATH) -> "DeliveryZoneIndex":
+        """Load zones, streets and postcode centroids from a local JSON dataset."""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        zones = [
+            DeliveryZone(z['branch_id'], z['name'], [tuple(p) for p in z['polygon']])
+            for z in data['zones']
+        ]
+        postcodes = {code: tuple(latlon) for code, latlon in data.get('postcodes', {}).items()}
+        return cls(zones, data.get('streets', []), postcodes)
+
+    def branch_for_point(self, lat: float, lon: float) -> Optional[str]:
+        """Return the branch id delivering to the point, if any."""
+        zone = self.grid.locate(lat, lon)
+        return zone.branch_id if zone else None
+
+    def match_address(self, text: str) -> Optional[AddressMatch]:
+        """Parse a free-text address and resolve it against the street and zone indexes.
+
+        A given postcode decides the location (and is a conflict if the matched street
+        doesn't run through it); otherwise the house number picks the street's section.
+        Streets missing from the dataset are kept as typed and located by postcode.
+        Returns None when neither a known street nor a known postcode is found.
+        """
+        postcode_match = _POSTCODE.search(text)
+        postcode = postcode_match.group(1) if postcode_match else None
+
+        tokens = [t.strip(",;:!?") for t in text.split()]
+        tokens = [t for t in tokens if t]
+        best = None
+        for size in (3, 2, 1):
+            for start in range(len(tokens) - size + 1):
+                window = tokens[start:start + size]
+                if any(_HOUSE_NUMBER.match(t.lower()) or _POSTCODE.fullmatch(t) for t in window):
+                    continue
+                found = self.streets.match(" ".join(window))
+                if found and (best is None or found[1] > best[1]):
+                    best = (found[0], found[1], start + size)
+            if best and best[1] >= 0.9:
+                break
+
+        if best:
+            street, score, end = best
+            house_number = next((t for t in tokens[end:] if _HOUSE_NUMBER.match(t.lower())), None)
+            sections = street.get('sections', [])
+            street_postcodes = {street['postcode']} | {section['postcode'] for section in sections}
+            conflict = None
+            located = True
+            if postcode:
+                if postcode not in street_postcodes:
+                    conflict = f"{street['name']} is not in postcode {postcode}"
+                lat, lon = self.postcodes.get(postcode, (street['lat'], street['lon']))
+            else:
+                section = self._section(sections, house_number)
+                if section:
+                    postcode = section['postcode']
+                    lat, lon = self.postcodes.get(postcode, (street['lat'], street['lon']))
+                else:
+                    postcode = street['postcode'] if len(street_postcodes) == 1 else None
+                    lat, lon = street['lat'], street['lon']
+                    located = len({self.branch_for_point(*self.postcodes[code])
+                                   for code in street_postcodes if code in self.postcodes}) <= 1
+            return AddressMatch(street['name'], house_number, postcode, lat, lon,
+                                self.branch_for_point(lat, lon), score, conflict=conflict, located=located)
+
+        if postcode in self.postcodes:
+            lat, lon = self.postcodes[postcode]
+            number_at = next((i for i, t in enumerate(tokens) if _HOUSE_NUMBER.match(t.lower())), None)
+            street_name = self._typed_street(tokens[:number_at] if number_at is not None else [])
+            return AddressMatch(street_name, tokens[number_at] if street_name else None, postcode, lat, lon,
+                                self.branch_for_point(lat, lon), 0.0, verified=False)
+        return None
+
+    @staticmethod
+    def _section(sections: List[Dict[str, Any]], house_number: Optional[str]) -> Optional[Dict[str, Any]]:
+        """The street section whose number range holds `house_number`."""
+        if not house_number:
+            return None
+        number = int(re.match(r"\d+", house_number).group())
+        return next((s for s in sections if s['numbers'][0] <= number <= s['numbers'][1]), None)
+
+    @staticmethod
+    def _typed_street(tokens: List[str]) -> Optional[str]:
+        """The street name the customer typed just before the house number, e.g. 'Linienstraße'."""
+        words = []
+        for token in reversed(tokens):
+            if not (token[:1].isupper() or token.lower() in _STREET_PARTICLES):
+                break
+            words.insert(0, token)
+        while words and words[0].lower() in _STREET_PARTICLES:
+            words.pop(0)
+        return " ".join(words) or None
+
+    def suggest_streets(self, prefix: str, limit: int = 5) -> List[str]:
+        """Autocomplete street names for the address prompt."""
+        return self.streets.autocomplete(prefix, limit)
@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Any, Callable
+
+STATUSES = ["confirmed", "preparing", "baking", "out_for_delivery", "delivered", "cancelled"]
+DEFAULT_ETA_MINUTES = 35
+
+
+@dataclass
+class OrderStatus:
+    order_id: str
+    session_id: str
+    branch_id: Optional[str]
+    status: str = "confirmed"
+    eta_minutes: Optional[int] = DEFAULT_ETA_MINUTES
+    updated_at: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Public fields; the session id is the customer's chat credential and stays server-side."""
+        data = asdict(self)
+        del data['session_id']
+        return data
+
+
+Listener = Callable[[OrderStatus], None]
+
+
+class OrderStatusBoard:
+    """Status and ETA of recent orders, with listeners per chat session.
+
+    Kitchen and driver updates arrive on Flask threads; listeners are called on the
+    updating thread, so they must only hand the update off (e.g. to an event loop).
+    Only the most recent `max_orders` orders are kept.
+    """
+
+    def __init__(self, max_orders: int = 10000):
+        self.max_orders = max_orders
+        self.orders: "OrderedDict[str, OrderStatus]" = OrderedDict()
+        self.listeners: Dict[str, List[Listener]] = defaultdict(list)
+        self.lock = threading.Lock()
+
+    def create(self, order_id: str, session_id: str, branch_id: Optional[str] = None,
+               eta_minutes: int = DEFAULT_ETA_MINUTES) -> OrderStatus:
+        order = OrderStatus(order_id, session_id, branch_id, eta_minutes=eta_minutes, updated_at=time.time())
+        with self.lock:
+            self.orders[order_id] = order
+            while len(self.orders) > self.max_orders:
+                self.orders.popitem(last=False)
+        self._notify(order)
+        return order
+
+    def get(self, order_id: str) -> Optional[OrderStatus]:
+        return self.orders.get(order_id)
+
+    def update(self, order_id: str, status: str, eta_minutes: Optional[int] = None) -> Optional[OrderStatus]:
+        """Set a new status (and ETA, if given); returns None for unknown orders."""
+        if status not in STATUSES:
+            raise ValueError(f"Unknown order status: {status}")
+        with self.lock:
+            order = self.orders.get(order_id)
+            if order is None:
+                return None
+            order.status = status
+            if eta_minutes is not None:
+                order.eta_minutes = eta_minutes
+            elif status in ("delivered", "cancelled"):
+                order.eta_minutes = None
+            order.updated_at = time.time()
+        self._notify(order)
+        return order
+
+    def subscribe(self, session_id: str, listener: Listener):
+        with self.lock:
+            self.listeners[session_id].append(listener)
+
+    def unsubscribe(self, session_id: str, listener: Listener):
+        with self.lock:
+            listeners = self.listeners.get(session_id)
+            if listeners and listener in listeners:
+                listeners.remove(listener)
+                if not listeners:
+                    del self.listeners[session_id]
+
+    def _notify(self, order: OrderStatus):
+        with self.lock:
+            listeners = list(self.listeners.get(order.session_id, ()))
+        for listener in listeners:
+            try:
+                listener(order)
+            except Exception as e:
+                print(f"Order status listener error: {e}")
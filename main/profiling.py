@@ -0,0 +1,386 @@
+"""Opt-in profiling for the Flask request path and WebSocket chat turns.
+
+Nothing is registered unless PIZZABAHN_PROFILE=1, so a disabled build pays nothing
+per request. When enabled, a request is captured if it carries an `X-Profile` header
+(cpu, memory or all) or is picked at random at PIZZABAHN_PROFILE_RATE (cpu only).
+A capture records:
+  * cProfile function stats, merged across captures
+  * wall-clock stack samples, merged into collapsed stacks (flamegraph.pl, speedscope)
+  * with memory, the tracemalloc allocations made during the request, by line
+One request is captured at a time; others arriving meanwhile are served unprofiled.
+WebSocket chat turns bypass Flask's hooks; they are sampled at the same rate
+(cpu only, there is no header) through `RequestProfiler.wrap`, labelled "WS chat".
+
+A background thread also snapshots the size of every branch's session_states
+every PIZZABAHN_PROFILE_HEAP_INTERVAL seconds (default 60). With
+PIZZABAHN_PROFILE_TRACEMALLOC=1, tracemalloc stays on and each snapshot lists the
+lines whose allocations grew the most since the previous one.
+
+The trigger header and the endpoints require PIZZABAHN_PROFILE_TOKEN in
+`X-Profile-Token`; while it is unset, the header is ignored (random sampling still
+runs) and the endpoints answer 403. Results are served at:
+    GET /debug/profile                  collapsed stacks (default)
+    GET /debug/profile?format=pstats    cProfile stats, by cumulative time
+    GET /debug/profile?format=memory    tracemalloc allocations per line
+    GET /debug/profile?format=heap      session_states snapshots (JSON)
+    POST /debug/profile/reset           clear everything collected so far
+
+    curl -H "X-Profile-Token: $TOKEN" -H 'X-Profile: all' -d '{"message": "hi"}' -H 'Content-Type: application/json' localhost:5000/api/chat
+    curl -H "X-Profile-Token: $TOKEN" localhost:5000/debug/profile > chat.folded && flamegraph.pl chat.folded > chat.svg
+"""
+import cProfile
+import functools
+import hmac
+import io
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from typing import Dict, Optional, Any, Callable, Tuple
+
+from flask import Response, g, jsonify, request
+
+MODES = {"cpu": (True, False), "memory": (False, True), "all": (True, True)}
+TRACEMALLOC_FRAMES = 1
+TOP_ENTRIES = 40
+
+
+def take_snapshot() -> tracemalloc.Snapshot:
+    """A tracemalloc snapshot without the allocations of tracemalloc and the import machinery."""
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    ])
+
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame) -> str:
+    """Root-first, semicolon separated function labels of a frame's stack."""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def deep_size(obj: Any, shared_types: Tuple[type, ...] = (), seen: Optional[set] = None) -> int:
+    """Approximate bytes held by an object graph of dicts, sequences and plain objects.
+
+    Instances of `shared_types` (objects every session points at) are not counted.
+    """
+    seen = set() if seen is None else seen
+    if id(obj) in seen or isinstance(obj, shared_types):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, shared_types, seen) + deep_size(v, shared_types, seen) for k, v in list(obj.items()))
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, shared_types, seen) for item in list(obj))
+    elif hasattr(obj, "__dict__"):
+        size += deep_size(vars(obj), shared_types, seen)
+    return size
+
+
+class StackSampler:
+    """Samples the stacks of the threads being captured every `interval` seconds.
+
+    The thread sleeps on an event while nothing is being captured.
+    """
+
+    def __init__(self, interval: float = 0.002):
+        self.interval = interval
+        self.targets: Dict[int, str] = {}  # thread id -> root label (the endpoint)
+        self.stacks: Counter = Counter()
+        self.wakeup = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self.thread.start()
+
+    def add(self, thread_id: int, label: str):
+        self.targets[thread_id] = label
+        self.wakeup.set()
+
+    def remove(self, thread_id: int):
+        self.targets.pop(thread_id, None)
+
+    def _run(self):
+        while True:
+            if not self.targets:
+                self.wakeup.wait()
+                self.wakeup.clear()
+                continue
+            frames = sys._current_frames()
+            for thread_id, label in list(self.targets.items()):
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self.stacks[f"{label};{collapse_stack(frame)}"] += 1
+            del frames
+            time.sleep(self.interval)
+
+
+class HeapMonitor:
+    """Periodic snapshots of session_states sizes across branches.
+
+    `chatbots` returns each branch's chatbot; its sessions are copied under the chatbot's
+    sessions_lock, since chat turns reorder and expire them concurrently.
+    """
+
+    def __init__(self, chatbots: Callable[[], Dict[str, Any]], interval: float = 60.0,
+                 trace_allocations: bool = False, shared_types: Tuple[type, ...] = (),
+                 sample_size: int = 100, keep: int = 120):
+        self.chatbots = chatbots
+        self.interval = interval
+        self.shared_types = shared_types
+        self.sample_size = sample_size
+        self.snapshots: deque = deque(maxlen=keep)
+        self.previous: Optional[tracemalloc.Snapshot] = None
+        self.trace_allocations = trace_allocations
+        if trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        self.thread = threading.Thread(target=self._run, name="profile-heap", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.snapshot()
+            except Exception as e:
+                print(f"Heap snapshot error: {e}")
+            time.sleep(self.interval)
+
+    def snapshot(self) -> Dict[str, Any]:
+        branches = {}
+        for branch_id, chatbot in self.chatbots().items():
+            with chatbot.sessions_lock:
+                sessions = list(chatbot.session_states.values())
+            sample = random.sample(sessions, min(len(sessions), self.sample_size))
+            per_session = sum(deep_size(state, self.shared_types) for state in sample) / len(sample) if sample else 0
+            branches[branch_id] = {"sessions": len(sessions),
+                                   "estimated_bytes": int(per_session * len(sessions))}
+        entry = {
+            "time": time.time(),
+            "sessions": sum(b["sessions"] for b in branches.values()),
+            "estimated_bytes": sum(b["estimated_bytes"] for b in branches.values()),
+            "rss_kb": _rss_kb(),
+            "branches": branches,
+        }
+        if self.trace_allocations:
+            current = take_snapshot()
+            if self.previous is not None:
+                entry["top_growth"] = [
+                    {"line": str(stat.traceback), "size_diff": stat.size_diff, "count_diff": stat.count_diff}
+                    for stat in current.compare_to(self.previous, "lineno")[:10]
+                ]
+            self.previous = current
+        self.snapshots.append(entry)
+        return entry
+
+
+def _rss_kb() -> int:
+    """Current resident set size on Linux, the peak elsewhere (0 on Windows)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:
+        return 0
+
+
+class RequestProfiler:
+    """Sampled per-request captures, aggregated for /debug/profile."""
+
+    def __init__(self, rate: float = 0.0, token: Optional[str] = None):
+        self.rate = rate
+        self.token = token
+        self.capture_lock = threading.Lock()
+        self.results_lock = threading.Lock()
+        self.sampler = StackSampler()
+        self.heap: Optional[HeapMonitor] = None
+        self.reset()
+
+    @classmethod
+    def from_env(cls) -> Optional["RequestProfiler"]:
+        """Profiler configured by the PIZZABAHN_PROFILE* variables, or None when profiling is off."""
+        if os.environ.get("PIZZABAHN_PROFILE", "").lower() not in ("1", "true", "yes"):
+            return None
+        return cls(rate=float(os.environ.get("PIZZABAHN_PROFILE_RATE", "0")),
+                   token=os.environ.get("PIZZABAHN_PROFILE_TOKEN") or None)
+
+    def reset(self):
+        with self.results_lock:
+            self.stats: Optional[pstats.Stats] = None
+            self.allocations: Counter = Counter()
+            self.sampler.stacks = Counter()
+            self.captures = 0
+            self.skipped = 0
+            self.capture_seconds = 0.0
+
+    def install(self, app, chatbots: Callable[[], Dict[str, Any]],
+                shared_types: Tuple[type, ...] = ()):
+        """Register the request hooks, the debug endpoints and the heap monitor on a Flask app.
+
+        `chatbots` returns each branch's chatbot, whose session_states are sized;
+        `shared_types` are skipped when sizing them.
+        """
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule("/debug/profile", "debug_profile", self._profile_endpoint, methods=["GET"])
+        app.add_url_rule("/debug/profile/reset", "debug_profile_reset", self._reset_endpoint, methods=["POST"])
+        interval = float(os.environ.get("PIZZABAHN_PROFILE_HEAP_INTERVAL", "60"))
+        if interval > 0:
+            trace = os.environ.get("PIZZABAHN_PROFILE_TRACEMALLOC", "").lower() in ("1", "true", "yes")
+            self.heap = HeapMonitor(chatbots, interval, trace_allocations=trace, shared_types=shared_types)
+        if self.token is None:
+            print(f"Profiling enabled (sample rate {self.rate:.2%}); set PIZZABAHN_PROFILE_TOKEN "
+                  f"to use the X-Profile header and /debug/profile")
+        else:
+            print(f"Profiling enabled (sample rate {self.rate:.2%}, header X-Profile)")
+
+    def _authorized(self) -> bool:
+        """Whether the request carries the profiling token; never true while no token is configured."""
+        if self.token is None:
+            return False
+        return hmac.compare_digest(request.headers.get("X-Profile-Token", "").encode(), self.token.encode())
+
+    def _before_request(self):
+        if request.path.startswith("/debug/"):
+            return
+        mode = request.headers.get("X-Profile")
+        if mode and self._authorized():
+            cpu, memory = MODES.get(mode.lower(), MODES["cpu"])
+        elif self.rate and random.random() < self.rate:
+            cpu, memory = MODES["cpu"]
+        else:
+            return
+        if not self.capture_lock.acquire(blocking=False):
+            self.skipped += 1
+            return
+        try:
+            g.profile_capture = self._start(f"{request.method} {request.url_rule or request.path}", cpu, memory)
+        except Exception:
+            self.capture_lock.release()
+            raise
+
+    def _teardown_request(self, exc=None):
+        capture = g.pop("profile_capture", None)
+        if capture is not None:
+            try:
+                self._finish(capture)
+            finally:
+                self.capture_lock.release()
+
+    def wrap(self, func: Callable[..., Any], label: str) -> Callable[..., Any]:
+        """Wrap work that runs outside a Flask request so calls are captured at the sample rate."""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self.rate or random.random() >= self.rate:
+                return func(*args, **kwargs)
+            if not self.capture_lock.acquire(blocking=False):
+                self.skipped += 1
+                return func(*args, **kwargs)
+            try:
+                capture = self._start(label, *MODES["cpu"])
+            except Exception:
+                self.capture_lock.release()
+                raise
+            try:
+                return func(*args, **kwargs)
+            finally:
+                try:
+                    self._finish(capture)
+                finally:
+                    self.capture_lock.release()
+        return wrapper
+
+    def _start(self, label: str, cpu: bool, memory: bool) -> Dict[str, Any]:
+        capture = {"started": 0.0, "thread_id": threading.get_ident(),
+                   "profile": None, "memory": memory, "tracemalloc_owner": False, "before": None}
+        if memory:
+            if tracemalloc.is_tracing():
+                capture["before"] = take_snapshot()
+            else:
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                capture["tracemalloc_owner"] = True
+        self.sampler.add(capture["thread_id"], label.replace(";", ","))
+        capture["started"] = time.perf_counter()
+        if cpu:
+            capture["profile"] = cProfile.Profile()
+            capture["profile"].enable()
+        return capture
+
+    def _finish(self, capture: Dict[str, Any]):
+        profile = capture["profile"]
+        if profile is not None:
+            profile.disable()
+        elapsed = time.perf_counter() - capture["started"]
+        self.sampler.remove(capture["thread_id"])
+        allocations = None
+        if capture["memory"]:
+            snapshot = take_snapshot()
+            if capture["tracemalloc_owner"]:
+                tracemalloc.stop()
+                allocations = snapshot.statistics("lineno")
+            else:
+                allocations = snapshot.compare_to(capture["before"], "lineno")
+        with self.results_lock:
+            self.captures += 1
+            self.capture_seconds += elapsed
+            if profile is not None:
+                if self.stats is None:
+                    self.stats = pstats.Stats(profile)
+                else:
+                    self.stats.add(profile)
+            for stat in allocations or ():
+                size = getattr(stat, "size_diff", stat.size)
+                if size > 0:
+                    self.allocations[str(stat.traceback)] += size
+
+    def _profile_endpoint(self):
+        if not self._authorized():
+            return jsonify({'error': 'Forbidden'}), 403  # also while no token is configured
+        output = request.args.get("format", "collapsed")
+        with self.results_lock:
+            if output == "collapsed":
+                stacks = dict(self.sampler.stacks)  # the sampler thread keeps adding to it
+                body = "\n".join(f"{stack} {count}" for stack, count in stacks.items())
+            elif output == "pstats":
+                body = self._format_pstats()
+            elif output == "memory":
+                body = "\n".join(f"{size / 1024:10.1f} KiB  {line}"
+                                 for line, size in self.allocations.most_common(TOP_ENTRIES))
+            elif output == "heap":
+                return jsonify({'snapshots': list(self.heap.snapshots) if self.heap else []})
+            else:
+                return jsonify({'error': "format must be collapsed, pstats, memory or heap"}), 400
+        return Response(body + "\n", mimetype="text/plain")
+
+    def _format_pstats(self) -> str:
+        header = (f"{self.captures} captured requests, {self.capture_seconds:.3f}s total, "
+                  f"{self.skipped} skipped while another capture was running\n")
+        if self.stats is None:
+            return header
+        stream = io.StringIO()
+        self.stats.stream = stream
+        self.stats.sort_stats("cumulative").print_stats(TOP_ENTRIES)
+        return header + stream.getvalue()
+
+    def _reset_endpoint(self):
+        if not self._authorized():
+            return jsonify({'error': 'Forbidden'}), 403
+        self.reset()
+        return jsonify({'message': 'Profile data cleared'})
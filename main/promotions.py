@@ -0,0 +1,295 @@
+import datetime
+import heapq
+import json
+import os
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any, Tuple, FrozenSet
+
+DEFAULT_PROMOTIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "promotions.json")
+
+_WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+# Exact search limits; past any of them, evaluate() picks the discounts greedily instead
+MAX_EXACT_PROMOTIONS = 12
+MAX_EXACT_UNITS = 200  # also bounds the search's recursion depth
+MAX_SEARCH_STATES = 2000
+MAX_SEARCH_SECONDS = 0.005  # checked every 64 states
+
+
+@dataclass
+class Promotion:
+    """An item-level deal: one unit-set per application, priced by one of the three rules.
+
+    `slots` lists (eligible item ids, units needed). A combo such as "2 pizzas + drink"
+    has two slots; a happy-hour discount is a single one-unit slot.
+    """
+    promo_id: str
+    name: str
+    slots: List[Tuple[FrozenSet[str], int]]
+    fixed_price: Optional[float] = None
+    percent_off: Optional[float] = None
+    amount_off: Optional[float] = None
+    days: Optional[FrozenSet[int]] = None  # weekday numbers, Monday = 0
+    start: Optional[str] = None  # "HH:MM"
+    end: Optional[str] = None
+
+    @property
+    def item_ids(self) -> FrozenSet[str]:
+        return frozenset().union(*(eligible for eligible, _ in self.slots))
+
+    def is_active(self, weekday: int, time_of_day: str) -> bool:
+        """Check the schedule; `time_of_day` is "HH:MM"."""
+        if self.days is not None and weekday not in self.days:
+            return False
+        if self.start and self.end:
+            return self.start <= time_of_day < self.end
+        return True
+
+    def cart_candidates(self, by_price: List[str]) -> List[List[str]]:
+        """Per slot, the cart's eligible item ids, most expensive first."""
+        return [[item_id for item_id in by_price if item_id in eligible] for eligible, _ in self.slots]
+
+    def best_application(self, remaining: Dict[str, int], candidates: List[List[str]],
+                         prices: Dict[str, float]) -> Optional[Tuple[float, Dict[str, int]]]:
+        """Savings and units used for one application, taking the most expensive eligible units.
+
+        `candidates` comes from `cart_candidates()` for the current cart.
+        """
+        used: Dict[str, int] = {}
+        base = 0.0
+        for (_, count), slot_candidates in zip(self.slots, candidates):
+            needed = count
+            for item_id in slot_candidates:
+                available = remaining.get(item_id, 0) - used.get(item_id, 0)
+                if available <= 0:
+                    continue
+                take = needed if needed < available else available
+                used[item_id] = used.get(item_id, 0) + take
+                base += prices[item_id] * take
+                needed -= take
+                if not needed:
+                    break
+            if needed:
+                return None
+        if self.fixed_price is not None:
+            savings = base - self.fixed_price
+        elif self.percent_off is not None:
+            savings = base * self.percent_off / 100
+        else:
+            savings = min(self.amount_off or 0.0, base)
+        if savings <= 0:
+            return None
+        return round(savings, 2), used
+
+
+@dataclass
+class Coupon:
+    """Order-level coupon code; at most one applies per order."""
+    code: str
+    name: str
+    percent_off: Optional[float] = None
+    amount_off: Optional[float] = None
+    min_subtotal: float = 0.0
+
+    def discount(self, amount: float) -> float:
+        if amount < self.min_subtotal:
+            return 0.0
+        if self.percent_off is not None:
+            return round(amount * self.percent_off / 100, 2)
+        return round(min(self.amount_off or 0.0, amount), 2)
+
+
+@dataclass
+class PriceBreakdown:
+    subtotal: float
+    discounts: List[Tuple[str, float]] = field(default_factory=list)
+    total: float = 0.0
+
+    def describe(self) -> str:
+        """One line per applied discount, for the model context."""
+        return "\n".join(f"- {name}: -€{amount:.2f}" for name, amount in self.discounts)
+
+
+class PromotionEngine:
+    """Compiled promotions: an index from item id to the promotions that can use it."""
+
+    def __init__(self, promotions: List[Promotion], coupons: List[Coupon]):
+        self.promotions = {promo.promo_id: promo for promo in promotions}
+        self.coupons = {coupon.code.upper(): coupon for coupon in coupons}
+        self.by_item: Dict[str, List[Promotion]] = defaultdict(list)
+        for promo in promotions:
+            for item_id in promo.item_ids:
+                self.by_item[item_id].append(promo)
+
+    @classmethod
+    def compile(cls, spec: Dict[str, Any], menu_data: Dict[str, Any]) -> "PromotionEngine":
+        """Build an engine from a JSON spec; category slots are expanded to menu item ids here."""
+        categories = {name: frozenset(item['id'] for item in menu_data[name]) for name in ("pizzas", "extras", "drinks")}
+        promotions = []
+        for raw in spec.get('promotions', []):
+            slots = []
+            for slot in raw['slots']:
+                eligible = categories[slot['category']] if 'category' in slot else frozenset(i.upper() for i in slot['items'])
+                slots.append((eligible, slot.get('count', 1)))
+            days = raw.get('days')
+            promotions.append(Promotion(
+                promo_id=raw['id'], name=raw['name'], slots=slots,
+                fixed_price=raw.get('fixed_price'), percent_off=raw.get('percent_off'), amount_off=raw.get('amount_off'),
+                days=frozenset(_WEEKDAYS.index(d) for d in days) if days else None,
+                start=raw.get('start'), end=raw.get('end'),
+            ))
+        coupons = [Coupon(**raw) for raw in spec.get('coupons', [])]
+        return cls(promotions, coupons)
+
+    @classmethod
+    def from_file(cls, menu_data: Dict[str, Any], path: str = DEFAULT_PROMOTIONS_PATH) -> "PromotionEngine":
+        with open(path, encoding="utf-8") as f:
+            return cls.compile(json.load(f), menu_data)
+
+    def get_coupon(self, code: Optional[str]) -> Optional[Coupon]:
+        return self.coupons.get(code.upper()) if code else None
+
+    def session(self) -> "PricingSession":
+        return PricingSession(self)
+
+
+class _SearchBudgetExceeded(Exception):
+    pass
+
+
+class PricingSession:
+    """Incremental pricing for one cart.
+
+    `update()` re-examines only the promotions indexed under the items whose quantity or
+    price changed; `evaluate()` then finds the best discount set over the active ones,
+    exactly for the usual handful of overlapping promotions and greedily (by cached
+    per-promotion savings bounds) for large catalogues.
+    """
+
+    def __init__(self, engine: PromotionEngine):
+        self.engine = engine
+        self.cart: Counter = Counter()
+        self.prices: Dict[str, float] = {}
+        self.bounds: Dict[str, float] = {}  # promo id -> savings of its best single application
+        self.candidates: Dict[str, List[List[str]]] = {}  # promo id -> eligible cart lines per slot
+        self.version = 0
+        self._active: Optional[Tuple[Any, List[Tuple[float, str]]]] = None
+        self._cached: Optional[Tuple[Any, PriceBreakdown]] = None
+
+    def update(self, cart: Counter, prices: Dict[str, float]):
+        """Apply the new cart contents (item id -> quantity) and unit prices."""
+        changed = [item_id for item_id in set(cart) | set(self.cart)
+                   if cart[item_id] != self.cart[item_id]
+                   or (cart[item_id] and prices.get(item_id) != self.prices.get(item_id))]
+        if not changed:
+            return
+        self.cart = +cart
+        self.prices = {item_id: prices[item_id] for item_id in self.cart}
+        by_price = sorted(self.cart, key=lambda item_id: -self.prices[item_id])
+        dirty = {promo.promo_id: promo for item_id in changed for promo in self.engine.by_item.get(item_id, ())}
+        for promo_id, promo in dirty.items():
+            candidates = promo.cart_candidates(by_price)
+            application = promo.best_application(self.cart, candidates, self.prices)
+            if application:
+                self.bounds[promo_id] = application[0]
+                self.candidates[promo_id] = candidates
+            else:
+                self.bounds.pop(promo_id, None)
+                self.candidates.pop(promo_id, None)
+        self.version += 1
+
+    def evaluate(self, coupon_code: Optional[str] = None, surcharge: float = 0.0,
+                 now: Optional[datetime.datetime] = None) -> PriceBreakdown:
+        """Best discount set for the current cart; `surcharge` (e.g. toppings) is added before coupons."""
+        now = now or datetime.datetime.now()
+        time_of_day = now.strftime("%H:%M")
+        active_key = (self.version, now.weekday(), time_of_day)
+        if not self._active or self._active[0] != active_key:
+            promotions = self.engine.promotions
+            active = [(-bound, promo_id) for promo_id, bound in self.bounds.items()
+                      if promotions[promo_id].is_active(now.weekday(), time_of_day)]
+            heapq.heapify(active)
+            # Schedules only matter through the set of active promotions, so one minute apart
+            # with the same set still hits the result cache below
+            self._active = (active_key, active)
+        active = self._active[1]
+        key = (self.version, tuple(promo_id for _, promo_id in active), coupon_code, surcharge)
+        if self._cached and self._cached[0] == key:
+            return self._cached[1]
+
+        subtotal = round(sum(self.prices[i] * n for i, n in self.cart.items()) + surcharge, 2)
+        breakdown = PriceBreakdown(subtotal)
+        discounts = None
+        if len(active) <= MAX_EXACT_PROMOTIONS and sum(self.cart.values()) <= MAX_EXACT_UNITS:
+            discounts = self._search([promo_id for _, promo_id in sorted(active)])
+        breakdown.discounts = discounts if discounts is not None else self._greedy(active)
+
+        discounted = subtotal - sum(amount for _, amount in breakdown.discounts)
+        coupon = self.engine.get_coupon(coupon_code)
+        if coupon:
+            amount = coupon.discount(discounted)
+            if amount:
+                breakdown.discounts.append((coupon.name, amount))
+                discounted -= amount
+        breakdown.total = round(max(discounted, 0.0), 2)
+        self._cached = (key, breakdown)
+        return breakdown
+
+    def _search(self, promo_ids: List[str]) -> Optional[List[Tuple[str, float]]]:
+        """Exact best discount set: for each promotion in turn, try every number of applications.
+
+        Memoized on (promotion, remaining units); returns None when the search would visit
+        more than MAX_SEARCH_STATES states or run longer than MAX_SEARCH_SECONDS.
+        """
+        promotions = self.engine.promotions
+        items = sorted(self.cart)
+        memo: Dict[Tuple[int, Tuple[int, ...]], Tuple[float, Tuple[Tuple[str, float], ...]]] = {}
+        deadline = time.perf_counter() + MAX_SEARCH_SECONDS
+
+        def best(index: int, units: Tuple[int, ...]) -> Tuple[float, Tuple[Tuple[str, float], ...]]:
+            if index == len(promo_ids):
+                return 0.0, ()
+            key = (index, units)
+            if key in memo:
+                return memo[key]
+            if len(memo) >= MAX_SEARCH_STATES or (len(memo) % 64 == 63 and time.perf_counter() > deadline):
+                raise _SearchBudgetExceeded
+            result = best(index + 1, units)
+            promo = promotions[promo_ids[index]]
+            application = promo.best_application(dict(zip(items, units)), self.candidates[promo.promo_id], self.prices)
+            if application:
+                savings, used = application
+                rest_savings, rest = best(index, tuple(n - used.get(item_id, 0) for item_id, n in zip(items, units)))
+                if savings + rest_savings > result[0] + 0.005:
+                    result = (savings + rest_savings, ((promo.name, savings),) + rest)
+            memo[key] = result
+            return result
+
+        try:
+            return list(best(0, tuple(self.cart[item_id] for item_id in items))[1])
+        except _SearchBudgetExceeded:
+            return None
+
+    def _greedy(self, active: List[Tuple[float, str]]) -> List[Tuple[str, float]]:
+        """Largest single-application savings first; fast, but can miss the best combination."""
+        active = list(active)
+        discounts = []
+        remaining = dict(self.cart)
+        while active:
+            _, promo_id = heapq.heappop(active)
+            promo = self.engine.promotions[promo_id]
+            application = promo.best_application(remaining, self.candidates[promo_id], self.prices)
+            if not application:
+                continue
+            savings, used = application
+            if active and savings < -active[0][0]:
+                # Earlier applications consumed units; re-queue with the lower bound
+                heapq.heappush(active, (-savings, promo_id))
+                continue
+            for item_id, units in used.items():
+                remaining[item_id] -= units
+            discounts.append((promo.name, savings))
+            heapq.heappush(active, (-savings, promo_id))
+        return discounts
@@ -0,0 +1,478 @@
+"""Offline conversation simulator for PizzaChatbot.
+
+Replays logged or synthetic conversations through PizzaChatbot with a fake model,
+in parallel across a process pool, and reports:
+  * step-transition invariant violations (checked against OrderState.get_next_step)
+  * stalls (a conversation stuck on the same step for too many turns)
+  * expectation mismatches (turns annotated with the step they should lead to)
+  * the order funnel with drop-off per step
+  * per-step and end-to-end latency of process_conversation
+  * turns per completed order
+
+With --structured the chatbot runs in structured output mode; synthetic turns carry
+the slot update the fake model should return for them.
+
+Each conversation is replayed through a chatbot for its branch's menu, so price
+overrides, unavailable items and the branch's delivery zone apply. Logged
+conversations are JSON lines; `branch_id` defaults to the default branch:
+    {"session_id": "abc", "branch_id": "mitte", "messages": ["hi", {"text": "yes", "expect_step": "place_order"}]}
+
+Usage:
+    python simulator.py --synthetic 100000
+    python simulator.py --synthetic 100000 --structured --model-latency 300
+    python simulator.py --log conversations.jsonl --model mymodule:MyFakeModel
+"""
+import argparse
+import importlib
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Any, Iterable, Tuple
+
+FUNNEL_STEPS = [
+    "greeting", "ask_dietary", "show_menu", "ask_pizzas", "ask_toppings", "ask_pizza_preferences",
+    "ask_sides_extras", "ask_drinks", "ask_address", "ask_contact_info", "check_required_info",
+    "show_summary", "confirm_order", "place_order", "end_conversation",
+]
+
+# Steps the flow may move back to outside of get_next_step
+RESET_STEP = "greeting"  # "restart"/"cancel" drop the session
+REJECTION_STEP = "show_menu"  # OrderState.handle_order_rejection
+MAX_HOPS_PER_TURN = 3
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeModel:
+    """Stand-in for genai.GenerativeModel: echoes the step it was asked about.
+
+    In JSON mode it answers with the slot update the simulator scripted for the current
+    turn (`next_slots`). `latency` adds a fixed delay per call, in seconds. With
+    `stream=True` the reply comes back in word chunks: half the delay passes before
+    the first one and the rest is spread over the others.
+    """
+
+    latency = 0.0
+
+    def __init__(self):
+        self.next_slots: Optional[Dict[str, Any]] = None
+
+    def generate_content(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None,
+                         stream: bool = False, **kwargs) -> Any:
+        step = prompt.split("Current Step:", 1)[-1].split("\n", 1)[0].strip()
+        reply = f"[{step}] OK"
+        if stream and not generation_config:
+            return self._stream(reply)
+        if self.latency:
+            time.sleep(self.latency)
+        if generation_config and generation_config.get("response_mime_type") == "application/json":
+            return FakeResponse(json.dumps({"reply": reply, "slots": self.next_slots or {"items": []}}))
+        return FakeResponse(reply)
+
+    def _stream(self, reply: str) -> Iterable[FakeResponse]:
+        words = reply.split(" ")
+        for i, word in enumerate(words):
+            if self.latency:
+                time.sleep(self.latency / 2 if i == 0 else self.latency / 2 / (len(words) - 1))
+            yield FakeResponse(word if i == 0 else " " + word)
+
+
+def load_model_class(spec: str):
+    """Resolve 'module:Class' to a class."""
+    module_name, _, class_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), class_name or "FakeModel")
+
+
+def build_transition_graph(order_state_cls) -> Dict[str, set]:
+    """Collect the edges get_next_step can produce, with both empty and complete order data."""
+    graph: Dict[str, set] = defaultdict(set)
+    for step in FUNNEL_STEPS:
+        for filled in (False, True):
+            state = order_state_cls()
+            if filled:
+                state.order_data['dietary_needs'] = "vegan"
+                state.order_data['pizzas'] = [{"id": "P1"}]
+                state.order_data['customer_info'] = {"name": "A", "phone": "1234567", "address": "x"}
+            state.step = step
+            graph[step].add(state.get_next_step())
+    return graph
+
+
+def reachable_within(graph: Dict[str, set], start: str, hops: int) -> set:
+    """All steps reachable from `start` in at most `hops` transitions (including staying put)."""
+    seen = {start}
+    frontier = {start}
+    for _ in range(hops):
+        frontier = {nxt for step in frontier for nxt in graph.get(step, ())} - seen
+        seen |= frontier
+    return seen
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram (10 buckets per decade, from 1us) that merges cheaply across processes."""
+
+    BUCKETS_PER_DECADE = 10
+
+    def __init__(self):
+        self.buckets: Counter = Counter()
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds: float):
+        micros = max(seconds * 1e6, 1.0)
+        self.buckets[int(math.log10(micros) * self.BUCKETS_PER_DECADE)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def merge(self, other: "LatencyHistogram"):
+        self.buckets.update(other.buckets)
+        self.count += other.count
+        self.total += other.total
+
+    def percentile(self, pct: float) -> float:
+        """Approximate percentile in seconds (upper edge of the bucket)."""
+        if not self.count:
+            return 0.0
+        target = self.count * pct / 100
+        running = 0
+        for bucket in sorted(self.buckets):
+            running += self.buckets[bucket]
+            if running >= target:
+                return 10 ** ((bucket + 1) / self.BUCKETS_PER_DECADE) / 1e6
+        return 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class SimulationStats:
+    """Per-worker results, merged in the parent."""
+
+    MAX_EXAMPLES = 5
+
+    def __init__(self):
+        self.conversations = 0
+        self.turns = 0
+        self.completed = 0
+        self.completed_turns = 0
+        self.reached: Counter = Counter()
+        self.final_steps: Counter = Counter()
+        self.violations: Counter = Counter()
+        self.examples: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.latency: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+        self.conversation_latency = LatencyHistogram()
+
+    def violation(self, kind: str, **details):
+        self.violations[kind] += 1
+        if len(self.examples[kind]) < self.MAX_EXAMPLES:
+            self.examples[kind].append(details)
+
+    def merge(self, other: "SimulationStats"):
+        self.conversations += other.conversations
+        self.turns += other.turns
+        self.completed += other.completed
+        self.completed_turns += other.completed_turns
+        self.reached.update(other.reached)
+        self.final_steps.update(other.final_steps)
+        self.violations.update(other.violations)
+        for kind, examples in other.examples.items():
+            room = self.MAX_EXAMPLES - len(self.examples[kind])
+            self.examples[kind].extend(examples[:room])
+        for step, hist in other.latency.items():
+            self.latency[step].merge(hist)
+        self.conversation_latency.merge(other.conversation_latency)
+
+
+class SyntheticConversations:
+    """Generates scripted customer conversations from the branch menus and street dataset.
+
+    A conversation is placed with the branch that delivers its address, except for a
+    `wrong_branch_rate` share that orders through another branch and should be refused.
+    """
+
+    GREETINGS = ["hi", "hello", "hey there", "hallo!", "I'd like to order a pizza"]
+    DIETARY = [("vegan", "vegan"), ("vegetarian please", "vegetarian"), ("I'm vegetarian", "vegetarian"),
+               ("no restrictions", None), ("I eat everything", None)]
+    NO_TOPPINGS = ["no thanks", "no", "none", "skip"]
+    CONFIRM_YES = ["yes", "yes please", "confirm", "ok, place it", "correct, proceed"]
+    CONFIRM_NO = ["no, I want to change it", "wrong, modify it"]
+    NAMES = ["Anna", "Jonas", "Leyla", "Mehmet", "Sofia", "Lukas", "Mia", "Noah"]
+
+    def __init__(self, menus: Dict[str, Any], delivery_zones, abandon_rate: float = 0.03, seed: int = 0,
+                 wrong_branch_rate: float = 0.05):
+        self.menus = {branch_id: menu_manager.menu_data for branch_id, menu_manager in menus.items()}
+        self.branch_ids = sorted(self.menus)
+        self.streets = delivery_zones.streets.streets
+        self.delivery_zones = delivery_zones
+        self.abandon_rate = abandon_rate
+        self.wrong_branch_rate = wrong_branch_rate
+        self.seed = seed
+
+    @staticmethod
+    def _pizzas_for(menu: Dict[str, Any], dietary: Optional[str]) -> List[Dict[str, Any]]:
+        if dietary == "vegan":
+            return [p for p in menu['pizzas'] if "vegan" in p['type'].lower()]
+        if dietary == "vegetarian":
+            return [p for p in menu['pizzas'] if "non-veg" not in p['type'].lower()]
+        return menu['pizzas']
+
+    def generate(self, index: int) -> Dict[str, Any]:
+        rng = random.Random(self.seed * 1_000_003 + index)
+        messages: List[Dict[str, Any]] = []
+
+        street = rng.choice(self.streets)
+        address = f"{street['name']} {rng.randint(1, 120)}, {street['postcode']} Berlin"
+        match = self.delivery_zones.match_address(address)
+        deliverable = bool(match and match.in_zone and match.branch_id in self.menus)
+        branch_id = match.branch_id if deliverable else rng.choice(self.branch_ids)
+        if deliverable and len(self.branch_ids) > 1 and rng.random() < self.wrong_branch_rate:
+            branch_id = rng.choice([b for b in self.branch_ids if b != match.branch_id])
+            deliverable = False
+        menu = self.menus[branch_id]
+        conversation = {"session_id": f"sim-{self.seed}-{index}", "branch_id": branch_id, "messages": messages}
+
+        def say(text: str, expect_step: Optional[str] = None, **slots):
+            turn = {"text": text, "slots": dict(slots, items=slots.get("items", []))}
+            if expect_step:
+                turn["expect_step"] = expect_step
+            messages.append(turn)
+
+        say(rng.choice(self.GREETINGS))
+        dietary_text, dietary = rng.choice(self.DIETARY)
+        say(dietary_text, dietary_needs=dietary or "none")
+        if rng.random() < 0.2:
+            say("can you show me the menu?")
+        pizzas = rng.sample(self._pizzas_for(menu, dietary), k=rng.choice([1, 1, 2]))
+        say(" and ".join(p['name'] for p in pizzas), items=[{"id": p['id'], "quantity": 1} for p in pizzas])
+        if rng.random() < 0.5:
+            say(rng.choice(self.NO_TOPPINGS), declined=True)
+        else:
+            topping = rng.choice(rng.choice(list(menu['toppings'].values())))
+            say(f"add {topping['name']}", toppings=[topping['name']])
+        preference = rng.choice(["extra spicy please", "normal is fine", "well done crust"])
+        say(preference, preferences=[preference])
+        for category, no_thanks in (("extras", "no sides"), ("drinks", "nothing to drink")):
+            if rng.random() < 0.6:
+                item = rng.choice(menu[category])
+                say(item['name'], items=[{"id": item['id'], "quantity": 1}])
+            else:
+                say(no_thanks, declined=True)
+        if not deliverable:
+            # This branch doesn't deliver there: the bot should keep asking and the customer gives up
+            say(address, expect_step="ask_address", contact={"address": address})
+            return conversation
+        say(address, contact={"address": address})
+        name = rng.choice(self.NAMES)
+        phone = f"0176{rng.randint(1000000, 9999999)}"
+        if rng.random() < 0.7:
+            say(f"my name is {name}, {phone}", contact={"name": name, "phone": phone})
+        else:
+            say(f"my name is {name}", contact={"name": name})
+            say(phone, contact={"phone": phone})
+        if rng.random() < 0.9:
+            say(rng.choice(self.CONFIRM_YES), expect_step="end_conversation", confirmation="yes")
+        else:
+            say(rng.choice(self.CONFIRM_NO), expect_step="show_menu", confirmation="no")
+
+        if rng.random() < self.abandon_rate * len(messages):
+            conversation["messages"] = messages[:rng.randint(1, len(messages) - 1)]
+        return conversation
+
+
+# ---- worker side -------------------------------------------------------------
+
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(model_spec: str, abandon_rate: float, seed: int, max_stall: int,
+                 structured: bool, model_latency: float):
+    sys.stdout = open(os.devnull, "w")  # the chatbot prints on every step
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import main
+    model = load_model_class(model_spec)()
+    if model_latency:
+        model.latency = model_latency
+    _worker['main'] = main
+    # One chatbot per branch, on the branch's (shared) menu, without analytics or quotas
+    chatbots = {}
+    for branch_id, tenant in main.tenants.tenants.items():
+        chatbot = main.PizzaChatbot(tenant.menu_manager, model, main.delivery_zones, structured, main.promotions)
+        chatbot.branch_id = branch_id
+        chatbots[branch_id] = chatbot
+    _worker['chatbots'] = chatbots
+    _worker['default_branch_id'] = main.tenants.default_branch_id
+    _worker['graph'] = build_transition_graph(main.OrderState)
+    _worker['synthetic'] = SyntheticConversations({b: c.menu_manager for b, c in chatbots.items()},
+                                                  main.delivery_zones, abandon_rate, seed)
+    _worker['max_stall'] = max_stall
+
+
+def _simulate(conversation: Dict[str, Any], stats: SimulationStats):
+    graph = _worker['graph']
+    session_id = conversation.get('session_id') or f"replay-{stats.conversations}"
+    branch_id = conversation.get('branch_id') or _worker['default_branch_id']
+    chatbot = _worker['chatbots'].get(branch_id)
+    if chatbot is None:
+        stats.violation("unknown_branch", session_id=session_id, branch_id=branch_id)
+        return
+    chatbot.reset_session(session_id)
+    reached = {RESET_STEP}
+    stall = 0
+    started = time.perf_counter()
+
+    for turn, message in enumerate(conversation['messages']):
+        expect = None
+        if isinstance(message, dict):
+            expect = message.get('expect_step')
+            if hasattr(chatbot.model, "next_slots"):
+                chatbot.model.next_slots = message.get('slots')
+            message = message['text']
+        before = chatbot.get_session_state(session_id).step
+        t0 = time.perf_counter()
+        chatbot.process_conversation([], message, session_id)
+        stats.latency[before].add(time.perf_counter() - t0)
+        stats.turns += 1
+        state = chatbot.get_session_state(session_id)
+        after = state.step
+        reached.update(state.turn_steps)  # steps passed through within the turn, e.g. show_summary
+        reached.add(after)
+
+        allowed = reachable_within(graph, before, MAX_HOPS_PER_TURN) | {RESET_STEP, REJECTION_STEP}
+        if after not in allowed:
+            stats.violation("illegal_transition", session_id=session_id, turn=turn,
+                            transition=f"{before} -> {after}", message=message)
+        if expect and after != expect:
+            stats.violation(f"unexpected_step:{before}", session_id=session_id, turn=turn,
+                            expected=expect, actual=after, message=message)
+        stall = stall + 1 if after == before else 0
+        if stall == _worker['max_stall']:
+            stats.violation(f"stalled:{after}", session_id=session_id, turn=turn, message=message)
+
+    final = chatbot.get_session_state(session_id).step
+    stats.conversation_latency.add(time.perf_counter() - started)
+    stats.conversations += 1
+    stats.reached.update(reached)
+    stats.final_steps[final] += 1
+    if final == "end_conversation":
+        stats.completed += 1
+        stats.completed_turns += len(conversation['messages'])
+    chatbot.reset_session(session_id)
+
+
+def _run_synthetic(bounds: Tuple[int, int]) -> SimulationStats:
+    stats = SimulationStats()
+    generator = _worker['synthetic']
+    for index in range(*bounds):
+        _simulate(generator.generate(index), stats)
+    return stats
+
+
+def _run_logged(conversations: List[Dict[str, Any]]) -> SimulationStats:
+    stats = SimulationStats()
+    for conversation in conversations:
+        _simulate(conversation, stats)
+    return stats
+
+
+# ---- parent side -------------------------------------------------------------
+
+def _chunks(items: List[Any], size: int) -> Iterable[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def run_simulation(synthetic: int = 0, log_path: Optional[str] = None, model_spec: str = "simulator:FakeModel",
+                   workers: Optional[int] = None, chunk_size: int = 500, abandon_rate: float = 0.03,
+                   seed: int = 0, max_stall: int = 4, structured: bool = False,
+                   model_latency: float = 0.0) -> SimulationStats:
+    """Run conversations across a process pool and return the merged stats."""
+    workers = workers or os.cpu_count() or 1
+    init_args = (model_spec, abandon_rate, seed, max_stall, structured, model_latency)
+    total = SimulationStats()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as pool:
+        if log_path:
+            with open(log_path, encoding="utf-8") as f:
+                conversations = [json.loads(line) for line in f if line.strip()]
+            results = pool.map(_run_logged, _chunks(conversations, chunk_size))
+        else:
+            bounds = [(start, min(start + chunk_size, synthetic)) for start in range(0, synthetic, chunk_size)]
+            results = pool.map(_run_synthetic, bounds)
+        for stats in results:
+            total.merge(stats)
+    return total
+
+
+def format_report(stats: SimulationStats, elapsed: float) -> str:
+    lines = [
+        f"Conversations: {stats.conversations}  turns: {stats.turns}  completed orders: {stats.completed} "
+        f"({stats.completed / max(stats.conversations, 1):.1%})",
+        f"Wall time: {elapsed:.1f}s  ({stats.conversations / max(elapsed, 1e-9):.0f} conversations/s)",
+        f"Turns per completed order: {stats.completed_turns / max(stats.completed, 1):.2f}",
+        f"Per conversation: mean {stats.conversation_latency.mean * 1e3:.2f} ms, "
+        f"p95 {stats.conversation_latency.percentile(95) * 1e3:.2f} ms",
+        "",
+        "FUNNEL",
+        f"  {'step':<24}{'reached':>10}{'ended here':>12}{'drop-off':>10}",
+    ]
+    for step in FUNNEL_STEPS:
+        reached = stats.reached.get(step, 0)
+        if not reached:
+            continue
+        ended = stats.final_steps.get(step, 0) if step != "end_conversation" else 0
+        lines.append(f"  {step:<24}{reached:>10}{ended:>12}{ended / reached:>10.1%}")
+    never = [step for step in FUNNEL_STEPS if not stats.reached.get(step)]
+    if never:
+        lines.append(f"  never reached: {', '.join(never)}")
+
+    lines += ["", "LATENCY (process_conversation, by step before the turn)",
+              f"  {'step':<24}{'turns':>10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"]
+    for step in FUNNEL_STEPS:
+        hist = stats.latency.get(step)
+        if not hist or not hist.count:
+            continue
+        lines.append(f"  {step:<24}{hist.count:>10}{hist.mean * 1e3:>10.3f}{hist.percentile(50) * 1e3:>10.3f}"
+                     f"{hist.percentile(95) * 1e3:>10.3f}{hist.percentile(99) * 1e3:>10.3f}")
+
+    lines += ["", "INVARIANT VIOLATIONS"]
+    if not stats.violations:
+        lines.append("  none")
+    for kind, count in stats.violations.most_common():
+        lines.append(f"  {kind}: {count}")
+        for example in stats.examples[kind]:
+            lines.append(f"      {json.dumps(example, ensure_ascii=False)}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--synthetic", type=int, help="number of synthetic conversations to generate")
+    source.add_argument("--log", help="JSON lines file of logged conversations to replay")
+    parser.add_argument("--model", default="simulator:FakeModel", help="fake model as module:Class")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--abandon-rate", type=float, default=0.03, help="per-turn chance a synthetic user leaves")
+    parser.add_argument("--max-stall", type=int, default=4, help="turns on one step before reporting a stall")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--structured", action="store_true", help="run the chatbot in structured output mode")
+    parser.add_argument("--model-latency", type=float, default=0.0, help="simulated model latency per call, in ms")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    stats = run_simulation(args.synthetic or 0, args.log, args.model, args.workers, args.chunk_size,
+                           args.abandon_rate, args.seed, args.max_stall, args.structured,
+                           args.model_latency / 1000)
+    print(format_report(stats, time.perf_counter() - started))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+from typing import Dict, List, Any, Callable
+
+# Reply plus slot update returned by the model in structured output mode.
+# Slots only carry what the customer said in the current message.
+RESPONSE_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "reply": {"type": "string", "maxLength": 4000},
+        "slots": {
+            "type": "object",
+            "properties": {
+                "dietary_needs": {"type": ["string", "null"], "enum": ["vegan", "vegetarian", "none", None]},
+                "items": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id": {"type": "string", "maxLength": 8},
+                            "quantity": {"type": "integer", "minimum": 1, "maximum": 20},
+                        },
+                        "required": ["id", "quantity"],
+                        "additionalProperties": False,
+                    },
+                },
+                "toppings": {"type": "array", "items": {"type": "string", "maxLength": 60}},
+                "preferences": {"type": "array", "items": {"type": "string", "maxLength": 100}},
+                "contact": {
+                    "type": "object",
+                    "properties": {
+                        "name": {"type": ["string", "null"], "maxLength": 80},
+                        "phone": {"type": ["string", "null"], "maxLength": 30},
+                        "address": {"type": ["string", "null"], "maxLength": 200},
+                    },
+                    "additionalProperties": False,
+                },
+                "declined": {"type": "boolean"},
+                "confirmation": {"type": ["string", "null"], "enum": ["yes", "no", None]},
+            },
+            "required": ["items"],
+            "additionalProperties": False,
+        },
+    },
+    "required": ["reply", "slots"],
+    "additionalProperties": False,
+}
+
+STRUCTURED_OUTPUT_INSTRUCTIONS = """
+            STRUCTURED OUTPUT:
+            Respond ONLY with a JSON object: {"reply": "<your message to the customer>", "slots": {...}}.
+            "slots" holds what the customer said in THIS message only:
+            - "items": menu items ordered, as [{"id": "P1", "quantity": 2}] using menu IDs (pizzas, extras, drinks)
+            - "toppings": additional topping names exactly as on the toppings list
+            - "preferences": pizza preferences such as spice level
+            - "dietary_needs": "vegan", "vegetarian" or "none" when the customer states it
+            - "contact": {"name", "phone", "address"} when given
+            - "declined": true if the customer said no to what the current step offers
+            - "confirmation": "yes" or "no" when answering the order confirmation
+            Use an empty "items" list and omit other fields when nothing was said about them.
+            If this message completes the contact details, show the order summary and ask for confirmation in "reply".
+            """
+
+_JSON_TYPES: Dict[str, Callable[[Any], bool]] = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "null": lambda v: v is None,
+}
+
+Validator = Callable[[Any, str, List[str]], None]
+
+
+def compile_schema(schema: Dict[str, Any]) -> Validator:
+    """Compile a JSON schema (the subset used above) into nested closures.
+
+    The schema is walked once here; validation only runs the precomputed checks.
+    Each check appends "path: problem" strings to the errors list.
+    """
+    checks: List[Validator] = []
+
+    if "type" in schema:
+        names = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+        type_checks = [_JSON_TYPES[name] for name in names]
+        expected = "/".join(names)
+
+        def check_type(value, path, errors):
+            if not any(check(value) for check in type_checks):
+                errors.append(f"{path}: expected {expected}, got {type(value).__name__}")
+        checks.append(check_type)
+
+    if "enum" in schema:
+        allowed = list(schema["enum"])
+
+        def check_enum(value, path, errors):
+            if value not in allowed:
+                errors.append(f"{path}: {value!r} is not one of {allowed}")
+        checks.append(check_enum)
+
+    if "maxLength" in schema:
+        max_length = schema["maxLength"]
+
+        def check_length(value, path, errors):
+            if isinstance(value, str) and len(value) > max_length:
+                errors.append(f"{path}: longer than {max_length} characters")
+        checks.append(check_length)
+
+    if "minimum" in schema or "maximum" in schema:
+        low = schema.get("minimum", float("-inf"))
+        high = schema.get("maximum", float("inf"))
+
+        def check_range(value, path, errors):
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and not low <= value <= high:
+                errors.append(f"{path}: {value} is outside [{low}, {high}]")
+        checks.append(check_range)
+
+    if "properties" in schema or "required" in schema:
+        properties = {name: compile_schema(sub) for name, sub in schema.get("properties", {}).items()}
+        required = list(schema.get("required", []))
+        closed = schema.get("additionalProperties", True) is False
+
+        def check_object(value, path, errors):
+            if not isinstance(value, dict):
+                return
+            for name in required:
+                if name not in value:
+                    errors.append(f"{path}.{name}: is required")
+            for name, item in value.items():
+                validator = properties.get(name)
+                if validator is not None:
+                    validator(item, f"{path}.{name}", errors)
+                elif closed:
+                    errors.append(f"{path}.{name}: unexpected property")
+        checks.append(check_object)
+
+    if "items" in schema:
+        item_validator = compile_schema(schema["items"])
+
+        def check_items(value, path, errors):
+            if isinstance(value, list):
+                for i, item in enumerate(value):
+                    item_validator(item, f"{path}[{i}]", errors)
+        checks.append(check_items)
+
+    def validate(value, path, errors):
+        for check in checks:
+            check(value, path, errors)
+    return validate
+
+
+_validate_response = compile_schema(RESPONSE_SCHEMA)
+
+
+def validate_response(payload: Any) -> List[str]:
+    """Validate a parsed model response against RESPONSE_SCHEMA; returns a list of errors."""
+    errors: List[str] = []
+    _validate_response(payload, "$", errors)
+    return errors
+
+
+def to_gemini_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Translate RESPONSE_SCHEMA to the OpenAPI subset Gemini's response_schema accepts."""
+    result: Dict[str, Any] = {}
+    names = schema.get("type")
+    if isinstance(names, list):
+        result["nullable"] = "null" in names
+        names = next(name for name in names if name != "null")
+    if names:
+        result["type"] = names.upper()
+    if "enum" in schema:
+        result["enum"] = [value for value in schema["enum"] if value is not None]
+        result["format"] = "enum"
+    if "properties" in schema:
+        result["properties"] = {name: to_gemini_schema(sub) for name, sub in schema["properties"].items()}
+    if "required" in schema:
+        result["required"] = list(schema["required"])
+    if "items" in schema:
+        result["items"] = to_gemini_schema(schema["items"])
+    return result
+
+
+GEMINI_RESPONSE_SCHEMA = to_gemini_schema(RESPONSE_SCHEMA)
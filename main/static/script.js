@@ -10,14 +10,27 @@ class ChatManager {
         this.viewMenuButton = document.getElementById('viewMenuButton');
         this.cancelOrderButton = document.getElementById('cancelOrderButton');
         this.restartOrderButton = document.getElementById('restartOrderButton');
+        this.addressSuggestions = document.getElementById('addressSuggestions');
         
         this.conversationHistory = [];
         this.sessionId = this.getOrCreateSessionId();
+        this.branchId = new URLSearchParams(window.location.search).get('branch');
         this.isTyping = false;
         this.isSpeaking = false;
         this.isRecording = false;
+        this.currentStep = null; // the bot's step after the last reply
+        this.suggestTimer = null;
+
+        // Persistent WebSocket channel; /api/chat is used whenever it isn't connected
+        this.wsPort = document.body.dataset.wsPort;
+        this.socket = null;
+        this.socketReady = false;
+        this.socketRetryDelay = 1000;
+        this.pendingTurn = null; // { resolve, streamDiv } for the message awaiting its reply
+        this.orderStatuses = {};
 
         this.bindEvents();
+        this.connectSocket();
 
         // Check for Speech Recognition API support
         window.SpeechRecognition = window.SpeechRecognition || window.webkitSpeechRecognition;
@@ -50,6 +63,7 @@ class ChatManager {
                 this.sendMessage();
             }
         });
+        this.messageInput.addEventListener('input', () => this.suggestAddress());
 
         this.microphoneButton.addEventListener('click', () => this.toggleSpeechToText());
         this.optionsButton.addEventListener('click', () => this.toggleDropdown());
@@ -58,6 +72,117 @@ class ChatManager {
         this.restartOrderButton.addEventListener('click', () => this.restartOrder());
     }
 
+    connectSocket() {
+        if (!this.wsPort || !window.WebSocket) return;
+        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+        this.socket = new WebSocket(`${protocol}//${window.location.hostname}:${this.wsPort}/`);
+
+        this.socket.onopen = () => {
+            this.socket.send(JSON.stringify({ type: 'hello', session_id: this.sessionId, branch_id: this.branchId }));
+        };
+        this.socket.onmessage = (event) => this.handleSocketMessage(JSON.parse(event.data));
+        this.socket.onclose = () => {
+            this.socketReady = false;
+            this.socket = null;
+            if (this.pendingTurn) {
+                // The server may already have processed the message, so don't re-send it over HTTP
+                const error = new Error('WebSocket closed before the reply arrived');
+                error.replyLost = true;
+                this.pendingTurn.reject(error);
+                this.pendingTurn = null;
+            }
+            setTimeout(() => this.connectSocket(), this.socketRetryDelay);
+            this.socketRetryDelay = Math.min(this.socketRetryDelay * 2, 30000);
+        };
+    }
+
+    handleSocketMessage(data) {
+        if (data.type === 'ready') {
+            this.socketReady = true;
+            this.socketRetryDelay = 1000;
+        } else if (data.type === 'chunk' && this.pendingTurn) {
+            if (!this.pendingTurn.streamDiv) {
+                this.hideTypingIndicator();
+                this.pendingTurn.streamDiv = this.addMessageToChat('bot', '');
+            }
+            this.pendingTurn.streamDiv.textContent += data.text;
+            this.scrollToBottom();
+        } else if ((data.type === 'reply' || data.type === 'error') && this.pendingTurn) {
+            const turn = this.pendingTurn;
+            this.pendingTurn = null;
+            turn.resolve({ type: data.kind || 'text', response: data.response, order_id: data.order_id,
+                           step: data.step, streamDiv: turn.streamDiv });
+        } else if (data.type === 'order_status') {
+            this.showOrderStatus(data);
+        } else if (data.type === 'error') {
+            console.error('WebSocket error:', data.response);
+        }
+    }
+
+    // Resolves with the reply, or null if the message could not be sent (sendMessage then
+    // uses HTTP); rejects if the connection dropped after it was sent
+    sendOverSocket(userMessage) {
+        return new Promise((resolve, reject) => {
+            if (this.socket.readyState !== WebSocket.OPEN) {
+                resolve(null);
+                return;
+            }
+            this.pendingTurn = { resolve, reject, streamDiv: null };
+            this.socket.send(JSON.stringify({ type: 'message', text: userMessage }));
+        });
+    }
+
+    // While the bot asks for the address, offer matching street names until a house number is typed
+    suggestAddress() {
+        clearTimeout(this.suggestTimer);
+        const query = this.messageInput.value.trim();
+        if (this.currentStep !== 'ask_address' || query.length < 3 || /\d/.test(query)) {
+            this.addressSuggestions.replaceChildren();
+            return;
+        }
+        this.suggestTimer = setTimeout(async () => {
+            try {
+                const response = await fetch(`/api/address/suggest?q=${encodeURIComponent(query)}`);
+                const data = await response.json();
+                this.addressSuggestions.replaceChildren(...(data.suggestions || []).map((name) => {
+                    const option = document.createElement('option');
+                    option.value = name;
+                    return option;
+                }));
+            } catch (error) {
+                console.error('Error fetching address suggestions:', error);
+            }
+        }, 200);
+    }
+
+    showOrderStatus(order) {
+        const previous = this.orderStatuses[order.order_id];
+        if (previous && previous.status === order.status && previous.eta_minutes === order.eta_minutes) return;
+        this.orderStatuses[order.order_id] = order;
+        const status = order.status.replace(/_/g, ' ');
+        const eta = order.eta_minutes ? ` (about ${order.eta_minutes} minutes)` : '';
+        this.addMessageToChat('bot', `Order ${order.order_id}: ${status}${eta}`);
+    }
+
+    // Without a WebSocket, check the order status once a minute until it is final
+    pollOrderStatus(orderId) {
+        const timer = setInterval(async () => {
+            if (this.socketReady) return; // pushed over the socket instead
+            try {
+                const response = await fetch(`/api/orders/${encodeURIComponent(orderId)}`);
+                if (!response.ok) {
+                    clearInterval(timer);
+                    return;
+                }
+                const order = await response.json();
+                this.showOrderStatus(order);
+                if (order.status === 'delivered' || order.status === 'cancelled') clearInterval(timer);
+            } catch (error) {
+                console.error('Error fetching order status:', error);
+            }
+        }, 60000);
+    }
+
     toggleDropdown() {
         this.dropdownMenu.classList.toggle('visible');
     }
@@ -131,26 +256,38 @@ class ChatManager {
 
         this.addMessageToChat('user', userMessage);
         this.messageInput.value = '';
+        this.addressSuggestions.replaceChildren();
         this.showTypingIndicator();
 
         const payload = {
             message: userMessage,
             history: this.conversationHistory,
-            session_id: this.sessionId
+            session_id: this.sessionId,
+            branch_id: this.branchId
         };
         
         try {
-            const response = await fetch('/api/chat', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify(payload)
-            });
-
-            const data = await response.json();
+            let data = this.socketReady && !this.pendingTurn ? await this.sendOverSocket(userMessage) : null;
+            if (!data) {
+                const response = await fetch('/api/chat', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify(payload)
+                });
+                data = await response.json();
+                if (data.order_id) this.pollOrderStatus(data.order_id);
+            }
             this.hideTypingIndicator();
+            if (data.step) this.currentStep = data.step;
             
             if (data.type === 'text') {
-                this.addMessageToChat('bot', data.response);
+                if (data.streamDiv) {
+                    // Replace the streamed text with the final reply (it may carry the order summary)
+                    data.streamDiv.textContent = data.response;
+                    this.scrollToBottom();
+                } else {
+                    this.addMessageToChat('bot', data.response);
+                }
                 this.conversationHistory.push({ role: 'user', content: userMessage });
                 this.conversationHistory.push({ role: 'bot', content: data.response });
             } else if (data.menu_data) {
@@ -163,7 +300,9 @@ class ChatManager {
         } catch (error) {
             this.hideTypingIndicator();
             console.error('Error fetching chat response:', error);
-            this.addMessageToChat('bot', "Sorry, I couldn't connect to the server. Please try again later.");
+            this.addMessageToChat('bot', error.replyLost
+                ? "Sorry, the connection dropped before I could answer. Please check the order before sending your message again."
+                : "Sorry, I couldn't connect to the server. Please try again later.");
         }
     }
 
@@ -172,7 +311,8 @@ class ChatManager {
         this.showTypingIndicator();
 
         try {
-            const response = await fetch('/api/menu');
+            const query = this.branchId ? `?branch_id=${encodeURIComponent(this.branchId)}` : '';
+            const response = await fetch(`/api/menu${query}`);
             const data = await response.json();
             this.hideTypingIndicator();
 
@@ -209,6 +349,7 @@ class ChatManager {
         messageDiv.appendChild(contentDiv);
         this.chatMessages.appendChild(messageDiv);
         this.scrollToBottom();
+        return contentDiv;
     }
     
 
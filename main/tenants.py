@@ -0,0 +1,180 @@
+import gc
+import json
+import os
+import threading
+import time
+import datetime
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any, Callable, Tuple
+from zoneinfo import ZoneInfo  # Windows needs the tzdata package
+
+DEFAULT_BRANCHES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "branches.json")
+
+_WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+
+@dataclass
+class BranchConfig:
+    branch_id: str
+    name: str
+    hours: Dict[str, List[str]] = field(default_factory=dict)  # {"mon": ["11:00", "23:00"], ...}
+    price_overrides: Dict[str, float] = field(default_factory=dict)  # item id -> price
+    unavailable_items: List[str] = field(default_factory=list)  # item ids not sold here
+    max_sessions: int = 1000  # live sessions; idle and finished ones expire
+    session_idle_minutes: int = 30
+    requests_per_minute: int = 600
+    timezone: str = "Europe/Berlin"  # opening hours are local time here
+
+    def menu_key(self) -> str:
+        """Fingerprint of everything that makes this branch's menu differ from the base menu."""
+        return json.dumps({
+            "prices": sorted((k.upper(), v) for k, v in self.price_overrides.items()),
+            "unavailable": sorted(i.upper() for i in self.unavailable_items),
+        })
+
+    def is_open(self, now: Optional[datetime.datetime] = None) -> bool:
+        """Check opening hours in the branch's time zone; a branch without configured hours is always open.
+
+        A naive `now` is taken to be local time at the branch already.
+        """
+        if not self.hours:
+            return True
+        if now is None:
+            now = datetime.datetime.now(ZoneInfo(self.timezone))
+        elif now.tzinfo is not None:
+            now = now.astimezone(ZoneInfo(self.timezone))
+        current = now.strftime("%H:%M")
+        today = self.hours.get(_WEEKDAYS[now.weekday()])
+        if today:
+            opens, closes = today
+            if opens <= current < closes or (closes < opens and current >= opens):
+                return True
+        # Late-night hours spilling over from yesterday (e.g. 18:00-02:00)
+        yesterday = self.hours.get(_WEEKDAYS[now.weekday() - 1])
+        if yesterday:
+            opens, closes = yesterday
+            if closes < opens and current < closes:
+                return True
+        return False
+
+
+def apply_menu_overrides(base_menu: Dict[str, Any], config: BranchConfig) -> Dict[str, Any]:
+    """Derive a branch menu from the base menu.
+
+    Unchanged items and the toppings table are shared with the base menu rather than
+    copied, so a branch only pays for the items it actually overrides.
+    """
+    if not config.price_overrides and not config.unavailable_items:
+        return base_menu
+    overrides = {k.upper(): v for k, v in config.price_overrides.items()}
+    unavailable = {i.upper() for i in config.unavailable_items}
+    menu = dict(base_menu)
+    for category in ("pizzas", "extras", "drinks"):
+        items = []
+        for item in base_menu[category]:
+            if item['id'] in unavailable:
+                continue
+            if item['id'] in overrides:
+                item = dict(item, price=overrides[item['id']])
+            items.append(item)
+        menu[category] = items
+    return menu
+
+
+class TenantQuota:
+    """Fixed one-minute window request limiter for a single branch."""
+
+    def __init__(self, requests_per_minute: int):
+        self.requests_per_minute = requests_per_minute
+        self.window_start = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        with self.lock:
+            if now - self.window_start >= 60:
+                self.window_start = now
+                self.count = 0
+            if self.count >= self.requests_per_minute:
+                return False
+            self.count += 1
+            return True
+
+
+class Tenant:
+    """One branch: shared menu/model, its own chatbot sessions and quota."""
+
+    def __init__(self, config: BranchConfig, menu_manager: Any, chatbot: Any):
+        self.config = config
+        self.menu_manager = menu_manager
+        self.chatbot = chatbot
+        self.quota = TenantQuota(config.requests_per_minute)
+
+    @property
+    def branch_id(self) -> str:
+        return self.config.branch_id
+
+    def admit(self, session_id: str) -> Optional[str]:
+        """Return None if the request may proceed, otherwise the reason it was refused."""
+        if not self.quota.allow():
+            return "rate_limited"
+        if session_id not in self.chatbot.session_states:
+            self.chatbot.expire_sessions(self.config.session_idle_minutes * 60)
+            if len(self.chatbot.session_states) >= self.config.max_sessions:
+                return "too_many_sessions"
+        return None
+
+
+class TenantRegistry:
+    """Routes branch ids to tenants.
+
+    Tenants with identical menus share one menu manager (and its rendered menu strings)
+    and one model, so memory grows with the number of distinct menus. Call `freeze()`
+    once everything is built, before the server forks its workers, so the shared
+    objects stay in copy-on-write pages.
+    """
+
+    def __init__(self, configs: List[BranchConfig], base_menu: Dict[str, Any],
+                 menu_factory: Callable[[Dict[str, Any]], Any],
+                 chatbot_factory: Callable[[Any, Any], Any],
+                 default_branch_id: Optional[str] = None):
+        if not configs:
+            raise ValueError("At least one branch must be configured")
+        self.tenants: Dict[str, Tenant] = {}
+        self._menus: Dict[str, Tuple[Any, Any]] = {}
+        for config in configs:
+            key = config.menu_key()
+            shared = self._menus.get(key)
+            if shared is None:
+                menu_manager = menu_factory(apply_menu_overrides(base_menu, config))
+                chatbot = chatbot_factory(menu_manager, None)
+                self._menus[key] = (menu_manager, chatbot.model)
+            else:
+                menu_manager = shared[0]
+                chatbot = chatbot_factory(*shared)
+            self.tenants[config.branch_id] = Tenant(config, menu_manager, chatbot)
+        self.default_branch_id = default_branch_id or configs[0].branch_id
+
+    @classmethod
+    def from_file(cls, base_menu: Dict[str, Any], menu_factory: Callable, chatbot_factory: Callable,
+                  path: str = DEFAULT_BRANCHES_PATH) -> "TenantRegistry":
+        """Load branch configs from a JSON file."""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        configs = [BranchConfig(**branch) for branch in data['branches']]
+        return cls(configs, base_menu, menu_factory, chatbot_factory, data.get('default_branch_id'))
+
+    @property
+    def distinct_menus(self) -> int:
+        return len(self._menus)
+
+    def get(self, branch_id: Optional[str] = None) -> Optional[Tenant]:
+        """Return the tenant for a branch id (the default branch if none given)."""
+        return self.tenants.get(branch_id or self.default_branch_id)
+
+    def freeze(self):
+        """Move everything built so far out of the GC's reach so forked workers don't dirty its pages."""
+        gc.collect()
+        if hasattr(gc, "freeze"):
+            gc.freeze()
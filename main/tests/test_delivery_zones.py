@@ -0,0 +1,90 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from delivery_zones import DeliveryZoneIndex, normalize_street  # noqa: E402
+
+
+class ZoneGridIndexTest(unittest.TestCase):
+    def test_grid_matches_brute_force(self):
+        index = DeliveryZoneIndex.from_file()
+        zones = list(index.zones.values())
+        min_lat = min(z.bbox[0] for z in zones) - 0.01
+        max_lat = max(z.bbox[2] for z in zones) + 0.01
+        min_lon = min(z.bbox[1] for z in zones) - 0.01
+        max_lon = max(z.bbox[3] for z in zones) + 0.01
+        rng = random.Random(0)
+        for _ in range(200_000):
+            lat, lon = rng.uniform(min_lat, max_lat), rng.uniform(min_lon, max_lon)
+            expected = next((z.branch_id for z in zones if z.contains(lat, lon)), None)
+            self.assertEqual(index.branch_for_point(lat, lon), expected, (lat, lon))
+
+
+class StreetIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.streets = DeliveryZoneIndex.from_file().streets
+
+    def test_normalize_street(self):
+        for name in ("Torstraße", "torstrasse", "Torstr.", "TORSTR"):
+            self.assertEqual(normalize_street(name), "torstr")
+
+    def test_trigram_match_tolerates_typos(self):
+        cases = {"Schonhauser Alle": "Schönhauser Allee", "Karl Marx Allee": "Karl-Marx-Allee",
+                 "warschauer str": "Warschauer Straße", "Kollwitzstrasse": "Kollwitzstraße"}
+        for text, name in cases.items():
+            street, _ = self.streets.match(text)
+            self.assertEqual(street['name'], name)
+
+    def test_unknown_street_does_not_match(self):
+        self.assertIsNone(self.streets.match("Linienstraße"))
+
+    def test_autocomplete_prefix(self):
+        self.assertEqual(self.streets.autocomplete("Karl", limit=2), ["Karl-Marx-Allee", "Karl-Marx-Straße"])
+
+
+class MatchAddressTest(unittest.TestCase):
+    def setUp(self):
+        self.index = DeliveryZoneIndex.from_file()
+
+    def test_full_address(self):
+        match = self.index.match_address("Torstraße 12, 10119 Berlin")
+        self.assertEqual(match.format(), "Torstraße 12, 10119 Berlin")
+        self.assertEqual((match.branch_id, match.missing, match.conflict), ("mitte", [], None))
+
+    def test_street_missing_from_dataset_keeps_customer_line(self):
+        match = self.index.match_address("Linienstraße 40, 10119 Berlin")
+        self.assertEqual(match.format(), "Linienstraße 40, 10119 Berlin")
+        self.assertFalse(match.verified)
+        self.assertEqual((match.branch_id, match.missing), ("mitte", []))
+
+    def test_postcode_only_is_missing_street(self):
+        match = self.index.match_address("10119 Berlin")
+        self.assertEqual(match.missing, ["street", "house number"])
+
+    def test_street_without_house_number(self):
+        match = self.index.match_address("I'm on Torstraße")
+        self.assertEqual(match.street, "Torstraße")
+        self.assertEqual(match.missing, ["house number"])
+
+    def test_postcode_not_on_street_is_a_conflict(self):
+        match = self.index.match_address("Torstraße 12, 10961 Berlin")
+        self.assertEqual(match.conflict, "Torstraße is not in postcode 10961")
+
+    def test_house_number_picks_street_section(self):
+        self.assertEqual(self.index.match_address("Karl-Marx-Allee 1").branch_id, "mitte")
+        self.assertEqual(self.index.match_address("Karl-Marx-Allee 100").branch_id, "friedrichshain")
+        self.assertFalse(self.index.match_address("Karl-Marx-Allee").located)
+
+    def test_given_postcode_decides_location(self):
+        match = self.index.match_address("Karl-Marx-Allee 1, 10243 Berlin")
+        self.assertEqual((match.postcode, match.branch_id), ("10243", "friedrichshain"))
+
+    def test_unknown_street_and_postcode(self):
+        self.assertIsNone(self.index.match_address("Hauptstraße 5, 99999 Irgendwo"))
+
+
+if __name__ == "__main__":
+    unittest.main()
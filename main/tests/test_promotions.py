@@ -0,0 +1,77 @@
+import datetime
+import os
+import sys
+import unittest
+from collections import Counter
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import promotions  # noqa: E402
+from promotions import PromotionEngine  # noqa: E402
+
+MENU = {
+    "pizzas": [{"id": "P1", "price": 8.50}, {"id": "P15", "price": 12.00}],
+    "extras": [{"id": "E1", "price": 4.00}, {"id": "E2", "price": 4.50}],
+    "drinks": [{"id": "D1", "price": 2.00}, {"id": "B1", "price": 3.50}, {"id": "B2", "price": 3.50}],
+}
+PRICES = {item["id"]: item["price"] for items in MENU.values() for item in items}
+
+MONDAY_HAPPY_HOUR = datetime.datetime(2024, 6, 3, 16, 0)
+MONDAY_EVENING = datetime.datetime(2024, 6, 3, 18, 0)
+SATURDAY_AFTERNOON = datetime.datetime(2024, 6, 8, 16, 0)
+
+
+class PricingSessionTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = PromotionEngine.from_file(MENU)
+
+    def price(self, items, now, coupon_code=None):
+        session = self.engine.session()
+        session.update(Counter(items), PRICES)
+        return session.evaluate(coupon_code, now=now)
+
+    def test_happy_hour_beats_combo(self):
+        breakdown = self.price({"P15": 2, "D1": 1}, MONDAY_HAPPY_HOUR)
+        self.assertEqual(breakdown.subtotal, 26.00)
+        self.assertEqual(breakdown.total, 21.20)
+        self.assertEqual(breakdown.discounts, [("Happy Hour: 20% off pizzas", 2.40)] * 2)
+
+    def test_combo_outside_happy_hour(self):
+        for now in (MONDAY_EVENING, SATURDAY_AFTERNOON):
+            breakdown = self.price({"P15": 2, "D1": 1}, now)
+            self.assertEqual(breakdown.total, 22.00)
+            self.assertEqual(breakdown.discounts, [("2 Pizzas + Drink for €22", 4.00)])
+
+    def test_independent_promotions_stack(self):
+        breakdown = self.price({"P15": 1, "E1": 1, "D1": 1, "B1": 1, "B2": 1}, MONDAY_EVENING)
+        self.assertEqual(sorted(breakdown.discounts), [("Any 2 Beers for €6.50", 0.50),
+                                                       ("Pizza + Garlic Bread: €1.50 off", 1.50)])
+        self.assertEqual(breakdown.total, 23.00)
+
+    def test_coupon_applies_after_deals(self):
+        breakdown = self.price({"P15": 2, "D1": 1}, MONDAY_HAPPY_HOUR, coupon_code="welcome10")
+        self.assertEqual(breakdown.discounts[-1], ("Coupon WELCOME10 (10% off)", 2.12))
+        self.assertEqual(breakdown.total, 19.08)
+
+    def test_cart_change_reprices(self):
+        session = self.engine.session()
+        session.update(Counter({"P15": 2}), PRICES)
+        self.assertEqual(session.evaluate(now=MONDAY_EVENING).total, 24.00)
+        session.update(Counter({"P15": 2, "D1": 1}), PRICES)
+        self.assertEqual(session.evaluate(now=MONDAY_EVENING).total, 22.00)
+        self.assertEqual(session.evaluate(now=MONDAY_HAPPY_HOUR).total, 21.20)
+
+    def test_greedy_fallback_for_large_catalogues(self):
+        with mock.patch.object(promotions, "MAX_EXACT_PROMOTIONS", 0):
+            breakdown = self.price({"P15": 2, "D1": 1}, MONDAY_HAPPY_HOUR)
+        self.assertEqual(breakdown.total, 22.00)
+
+    def test_greedy_fallback_when_search_budget_runs_out(self):
+        with mock.patch.object(promotions, "MAX_SEARCH_STATES", 1):
+            breakdown = self.price({"P15": 2, "D1": 1}, MONDAY_HAPPY_HOUR)
+        self.assertEqual(breakdown.total, 22.00)
+
+
+if __name__ == "__main__":
+    unittest.main()
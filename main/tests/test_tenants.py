@@ -0,0 +1,34 @@
+import datetime
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tenants import BranchConfig  # noqa: E402
+
+UTC = datetime.timezone.utc
+
+
+class OpeningHoursTest(unittest.TestCase):
+    def setUp(self):
+        self.branch = BranchConfig("mitte", "PizzaBahn Mitte",
+                                   hours={"mon": ["11:00", "23:00"], "fri": ["11:00", "02:00"]})
+
+    def test_naive_time_is_branch_local(self):
+        self.assertTrue(self.branch.is_open(datetime.datetime(2024, 1, 8, 22, 30)))  # Monday
+        self.assertFalse(self.branch.is_open(datetime.datetime(2024, 1, 8, 23, 30)))
+
+    def test_aware_time_is_converted_to_berlin(self):
+        # Monday 21:30 UTC is 22:30 in Berlin in winter (open) and 23:30 in summer (closed)
+        self.assertTrue(self.branch.is_open(datetime.datetime(2024, 1, 8, 21, 30, tzinfo=UTC)))
+        self.assertFalse(self.branch.is_open(datetime.datetime(2024, 7, 8, 21, 30, tzinfo=UTC)))
+
+    def test_late_night_hours_spill_into_next_day(self):
+        # Saturday 00:30 UTC is 01:30 in Berlin, still inside Friday's 11:00-02:00
+        self.assertTrue(self.branch.is_open(datetime.datetime(2024, 1, 13, 0, 30, tzinfo=UTC)))
+        self.assertFalse(self.branch.is_open(datetime.datetime(2024, 1, 13, 1, 30, tzinfo=UTC)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,217 @@
+"""WebSocket transport for the chat UI.
+
+Each browser tab keeps one connection open instead of opening a POST (with the whole
+history) per message. The connection carries only new messages, streams the reply as
+it is generated, and pushes order status / ETA changes. Connections live on one
+asyncio loop; only chat turns use the thread pool, so idle connections cost a
+coroutine and a socket. /api/chat stays as the fallback transport.
+
+Frames are JSON text messages:
+  client -> server
+    {"type": "hello", "session_id": "...", "branch_id": "mitte"}   first frame
+    {"type": "message", "text": "..."}
+    {"type": "ping"}
+  server -> client
+    {"type": "ready", "session_id": "...", "branch_id": "..."}
+    {"type": "chunk", "text": "..."}                              reply text as it streams
+    {"type": "reply", "response": "...", "kind": "text", "step": "...", ...}   final reply, as /api/chat returns it
+    {"type": "order_status", "order_id": "...", "status": "...", "eta_minutes": 30, ...}
+    {"type": "pong"} / {"type": "error", "response": "..."}
+
+main.py starts this server next to Flask. To run it alone (its sessions are then
+separate from the Flask process):
+    python ws_server.py --port 5001
+    python ws_server.py --port 5001 --fake-model --model-latency 200 --unlimited   # for benchmarks
+"""
+import argparse
+import asyncio
+import json
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Any, Callable, Tuple
+
+try:
+    from websockets.asyncio.server import serve
+    from websockets.exceptions import ConnectionClosed
+except ImportError:  # the UI falls back to /api/chat
+    serve = None
+    ConnectionClosed = Exception
+
+from order_status import OrderStatus, OrderStatusBoard
+
+HELLO_TIMEOUT = 10.0  # seconds a new connection gets to identify its session
+MAX_MESSAGE_BYTES = 16 * 1024
+
+
+def raise_fd_limit() -> Optional[int]:
+    """Raise the open-file soft limit to the hard limit; returns the new limit (None on Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+class ChatSocketServer:
+    """Serves chat sessions over WebSockets using the same tenants as the Flask app.
+
+    `admission_error(tenant, session_id)` and `run_turn(tenant, message, session_id, on_chunk=...)`
+    are main.py's helpers, so both transports apply the same quotas and order handling.
+    """
+
+    def __init__(self, tenants: Any, admission_error: Callable[[Any, str], Optional[Tuple[str, int]]],
+                 run_turn: Callable[..., Dict[str, Any]], order_status: OrderStatusBoard,
+                 max_workers: int = 64):
+        if serve is None:
+            raise RuntimeError("The websockets package is required: pip install websockets")
+        self.tenants = tenants
+        self.admission_error = admission_error
+        self.run_turn = run_turn
+        self.order_status = order_status
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ws-chat")
+        self.connections = 0
+        self.pending = set()  # in-flight pushes, referenced until done
+
+    async def send(self, websocket, payload: Dict[str, Any]):
+        try:
+            await websocket.send(json.dumps(payload, ensure_ascii=False))
+        except ConnectionClosed:
+            pass
+
+    def push(self, websocket, payload: Dict[str, Any]):
+        """Schedule a send on the loop without waiting for it."""
+        task = asyncio.ensure_future(self.send(websocket, payload))
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+
+    async def handle(self, websocket):
+        try:
+            hello = json.loads(await asyncio.wait_for(websocket.recv(), HELLO_TIMEOUT))
+        except (asyncio.TimeoutError, ValueError, ConnectionClosed):
+            return
+        if not isinstance(hello, dict) or hello.get('type') != 'hello':
+            await websocket.close(1008, "expected hello")
+            return
+
+        session_id = str(hello.get('session_id') or uuid.uuid4())
+        tenant = self.tenants.get(hello.get('branch_id'))
+        if tenant is None:
+            await self.send(websocket, {'type': 'error', 'response': "Sorry, we don't know that PizzaBahn branch."})
+            await websocket.close(1008, "unknown branch")
+            return
+
+        loop = asyncio.get_running_loop()
+
+        def on_order_status(order: OrderStatus):  # called on Flask or chat threads
+            loop.call_soon_threadsafe(self.push, websocket, {'type': 'order_status', **order.to_dict()})
+
+        self.order_status.subscribe(session_id, on_order_status)
+        self.connections += 1
+        try:
+            await self.send(websocket, {'type': 'ready', 'session_id': session_id, 'branch_id': tenant.branch_id})
+            async for raw in websocket:
+                try:
+                    message = json.loads(raw)
+                except ValueError:
+                    await self.send(websocket, {'type': 'error', 'response': "Malformed message."})
+                    continue
+                kind = message.get('type') if isinstance(message, dict) else None
+                if kind == 'message':
+                    await self.chat_turn(websocket, tenant, session_id, str(message.get('text', '')).strip())
+                elif kind == 'ping':
+                    await self.send(websocket, {'type': 'pong'})
+                else:
+                    await self.send(websocket, {'type': 'error', 'response': f"Unknown message type: {kind}"})
+        except ConnectionClosed:
+            pass
+        finally:
+            self.connections -= 1
+            self.order_status.unsubscribe(session_id, on_order_status)
+
+    async def chat_turn(self, websocket, tenant, session_id: str, text: str):
+        """Run one message through the chatbot on the thread pool, streaming chunks back."""
+        if not text:
+            await self.send(websocket, {'type': 'error', 'response': "Please provide a message."})
+            return
+        print(f"📨 Received message over WebSocket from session {session_id}: {text[:50]}...")
+        error = self.admission_error(tenant, session_id)
+        if error:
+            await self.send(websocket, {'type': 'reply', 'response': error[0], 'kind': 'text',
+                                        'session_id': session_id, 'branch_id': tenant.branch_id})
+            return
+
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue()
+
+        def on_chunk(chunk: str):  # called on the chat thread
+            loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+
+        future = loop.run_in_executor(self.executor, lambda: self.run_turn(tenant, text, session_id, on_chunk=on_chunk))
+        future.add_done_callback(lambda _: chunks.put_nowait(None))
+        while True:
+            chunk = await chunks.get()
+            if chunk is None:
+                break
+            await websocket.send(json.dumps({'type': 'chunk', 'text': chunk}, ensure_ascii=False))
+
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"WebSocket chat error: {e}")
+            await self.send(websocket, {'type': 'error', 'response': "Sorry, I'm having technical difficulties. Please try again!"})
+            return
+        reply = {'type': 'reply', 'response': result['content'], 'kind': result['type'],
+                 'session_id': session_id, 'branch_id': tenant.branch_id, 'step': result.get('step')}
+        if result.get('order'):
+            reply['order_id'] = result['order']['order_id']
+        await self.send(websocket, reply)
+
+    async def serve_forever(self, host: str = "0.0.0.0", port: int = 5001):
+        # No per-message compression: its zlib buffers would dominate the cost of an idle connection
+        async with serve(self.handle, host, port, compression=None, max_size=MAX_MESSAGE_BYTES,
+                         max_queue=4, ping_interval=30, ping_timeout=30) as server:
+            print(f"WebSocket chat server listening on ws://{host}:{port}")
+            await server.serve_forever()
+
+    def start_in_thread(self, host: str = "0.0.0.0", port: int = 5001) -> threading.Thread:
+        """Run the server on its own event loop in a daemon thread (next to the Flask server)."""
+        raise_fd_limit()
+        thread = threading.Thread(target=lambda: asyncio.run(self.serve_forever(host, port)),
+                                  name="ws-server", daemon=True)
+        thread.start()
+        return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--workers", type=int, default=64, help="threads running chat turns")
+    parser.add_argument("--fake-model", action="store_true", help="answer with simulator.FakeModel instead of Gemini")
+    parser.add_argument("--model-latency", type=float, default=0.0, help="fake model delay per call, in ms")
+    parser.add_argument("--unlimited", action="store_true", help="ignore branch quotas and opening hours")
+    args = parser.parse_args()
+
+    import main as app_module
+    if args.fake_model:
+        from simulator import FakeModel
+        FakeModel.latency = args.model_latency / 1000
+    for tenant in app_module.tenants.tenants.values():
+        if args.fake_model:
+            tenant.chatbot.model = FakeModel()
+        if args.unlimited:
+            tenant.config.hours = {}
+            tenant.config.max_sessions = tenant.quota.requests_per_minute = 10 ** 9
+
+    raise_fd_limit()
+    server = ChatSocketServer(app_module.tenants, app_module.admission_error, app_module.ws_run_turn,
+                              app_module.order_status, max_workers=args.workers)
+    asyncio.run(server.serve_forever(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()